@@ -0,0 +1,195 @@
+""" Benchmarks the solver, embedding and tile construction hot paths. This does path related
+tomfoolery like tests.py, and is designed to be run from the project root folder:
+
+    python benchmarks/benchmark.py --output bench.json
+    python benchmarks/benchmark.py --output bench.json --baseline baseline.json
+    python benchmarks/benchmark.py --size vectorized=26 --size embed=6:0.5,10:0.1 --max-variables 20
+
+Results are written as JSON. When a baseline is given, any benchmark that got slower than the
+baseline by more than the tolerance is reported, and the exit code is 1. Problem sizes are part of
+the benchmark names, so only runs at the same sizes are compared. """
+import argparse
+import json
+import os
+import pathlib
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(pathlib.Path(__file__).resolve().parent.parent, 'src'))
+
+#pylint: disable=wrong-import-position
+from qubo_module.boolean_set_module import BooleanSetModule
+from qubo_module.brute_force_solver import BruteForceSolver
+from qubo_module.tile import BipartiteCellTile, FullyConnectedTile, GridOfCliquesTile
+
+def random_qubo(variable_count, seed, density=0.5) :
+    """ A random model with integer coefficients in [-3, 3] """
+    rng = random.Random(seed)
+    names = [f'v{i}' for i in range(variable_count)]
+    linear = {name : rng.randint(-3, 3) for name in names}
+    quadratic = {}
+    for i in range(variable_count) :
+        for j in range(i+1, variable_count) :
+            if rng.random() < density :
+                quadratic[(names[i], names[j])] = rng.randint(-3, 3)
+    return linear, quadratic
+
+def random_boolean_set(width, density, seed) :
+    """ A random set string of the given width, containing zero, with each other element present
+    with probability density """
+    rng = random.Random(seed)
+    elements = ['0' * width] + [format(x, f'0{width}b') for x in range(1, 2**width) if rng.random() < density]
+    return '|'.join(elements)
+
+def measure(fn, repeat) :
+    """ Returns the best wall time of fn over repeat runs, and the peak traced memory of one run """
+    best = None
+    for _ in range(repeat) :
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+# Problem sizes of the full and --quick runs. Solver sizes are variable counts, embed is a list of
+# (set width, element density), and tile is the tile width and height.
+SIZES = {
+    'full' : { 'python' : 14, 'gray_code' : 18, 'vectorized' : 24, 'sparse' : 24, 'for_each_solution' : 12,
+               'iter_solution_chunks' : 22, 'embed' : [(6, 0.5), (9, 0.25)], 'tile' : 16 },
+    'quick' : { 'python' : 12, 'gray_code' : 14, 'vectorized' : 18, 'sparse' : 18, 'for_each_solution' : 10,
+                'iter_solution_chunks' : 18, 'embed' : [(6, 0.5)], 'tile' : 8 },
+}
+
+def parse_size(text) :
+    """ Parses a --size argument of the form key=value into (key, value) """
+    key, _, value = text.partition('=')
+    if key not in SIZES['full'] or not value :
+        raise argparse.ArgumentTypeError(f"expected one of {', '.join(SIZES['full'])} as key=value, got '{text}'")
+    try :
+        if key == 'embed' :
+            pairs = [pair.split(':') for pair in value.split(',')]
+            return key, [(int(width), float(density)) for width, density in pairs]
+        return key, int(value)
+    except ValueError as error :
+        raise argparse.ArgumentTypeError(f"invalid size '{text}'") from error
+
+def solver_cases(sizes) :
+    """ (name, fn, work, unit) for the brute force solver """
+    cases = []
+    for engine in ('python', 'gray_code', 'vectorized') :
+        n = sizes[engine]
+        linear, quadratic = random_qubo(n, seed=n)
+        solver = BruteForceSolver(linear, quadratic, engine=engine)
+        cases.append((f'solve/{engine}/n={n}', solver.solve, 2**n, 'assignments'))
+
+    # Sparse models, where the bit sliced engine only pays for the nonzero terms
+    n = sizes['sparse']
+    for engine in ('vectorized', 'bit_sliced') :
+        solver = BruteForceSolver(*random_qubo(n, seed=n, density=0.1), engine=engine)
+        cases.append((f'solve_sparse/{engine}/n={n}', solver.solve, 2**n, 'assignments'))
+
+    n = sizes['for_each_solution']
+    solver = BruteForceSolver(*random_qubo(n, seed=n))
+    cases.append((f'for_each_solution/n={n}', lambda: solver.for_each_solution(lambda solution, obj : None), 2**n, 'assignments'))
+
+    n = sizes['iter_solution_chunks']
+    chunked = BruteForceSolver(*random_qubo(n, seed=n), engine='vectorized')
+    def consume_chunks() :
+        for _ in chunked.iter_solution_chunks() :
+            pass
+    cases.append((f'iter_solution_chunks/n={n}', consume_chunks, 2**n, 'assignments'))
+    return cases
+
+def embedding_cases(sizes) :
+    """ (name, fn, work, unit) for embedding boolean sets """
+    cases = []
+    for width, density in sizes['embed'] :
+        module = BooleanSetModule(random_boolean_set(width, density, seed=width))
+        count = len(module.elements)
+        cases.append((f'embed/width={width}/density={density}', module.embed, count, 'elements'))
+        cases.append((f'embed_compact/width={width}/density={density}', module.embed_compact, count, 'elements'))
+    return cases
+
+def tile_cases(sizes) :
+    """ (name, fn, work, unit) for tile construction """
+    size = sizes['tile']
+    cases = [
+        (f'tile/fully_connected/{size}x{size}', lambda: FullyConnectedTile(size, size, size), 5 * size, 'qubits'),
+        (f'tile/bipartite_cell/{size}x{size}x4', lambda: BipartiteCellTile(size, size, 4), size * size * 8, 'qubits'),
+        (f'tile/grid_of_cliques/{size}x{size}x8', lambda: GridOfCliquesTile(size, size, 8), size * size * 8, 'qubits'),
+    ]
+    return cases
+
+def run(sizes, repeat) :
+    """ Runs every benchmark at the given sizes, returning the results keyed by benchmark name """
+    results = {}
+    for name, fn, work, unit in solver_cases(sizes) + embedding_cases(sizes) + tile_cases(sizes) :
+        wall_time, peak_memory = measure(fn, repeat)
+        throughput = work / wall_time if wall_time > 0 else None
+        results[name] = {
+            'wall_time' : wall_time,
+            'peak_memory' : peak_memory,
+            'work' : work,
+            'unit' : unit,
+            'throughput' : throughput,
+        }
+        rate = f'{throughput:14.0f}' if throughput is not None else f'{"-":>14}'
+        print(f'{name:50} {wall_time*1000:10.2f} ms {rate} {unit}/s {peak_memory / 2**20:8.2f} MiB')
+    return results
+
+def compare(results, baseline, tolerance) :
+    """ Returns the names of benchmarks that are slower than the baseline by more than tolerance """
+    regressions = []
+    for name, result in results.items() :
+        if name in baseline and result['wall_time'] > baseline[name]['wall_time'] * (1 + tolerance) :
+            ratio = result['wall_time'] / baseline[name]['wall_time']
+            print(f'REGRESSION {name}: {ratio:.2f}x the baseline wall time')
+            regressions.append(name)
+    return regressions
+
+def main() :
+    """ Command line entry point """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default='bench_output.json', help='where to write the JSON results')
+    parser.add_argument('--baseline', help='JSON results from an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown relative to the baseline')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per benchmark, the fastest is kept')
+    parser.add_argument('--quick', action='store_true', help='use smaller problem sizes')
+    parser.add_argument('--size', type=parse_size, action='append', default=[], metavar='KEY=VALUE',
+                        help=f"override a problem size, one of {', '.join(SIZES['full'])}, "
+                        + 'e.g. vectorized=26 or embed=6:0.5,9:0.25')
+    parser.add_argument('--max-variables', type=int, help='cap the variable count of every solver benchmark')
+    args = parser.parse_args()
+
+    sizes = dict(SIZES['quick' if args.quick else 'full'], **dict(args.size))
+    if args.max_variables is not None :
+        for key, value in sizes.items() :
+            if key not in ('embed', 'tile') :
+                sizes[key] = min(value, args.max_variables)
+
+    output = {
+        'python' : platform.python_version(),
+        'platform' : platform.platform(),
+        'quick' : args.quick,
+        'sizes' : sizes,
+        'results' : run(sizes, args.repeat),
+    }
+    with open(args.output, 'w', encoding='utf-8') as file :
+        json.dump(output, file, indent=2)
+
+    if args.baseline is not None :
+        with open(args.baseline, encoding='utf-8') as file :
+            baseline = json.load(file)['results']
+        if compare(output['results'], baseline, args.tolerance) :
+            sys.exit(1)
+
+if __name__ == '__main__' :
+    main()
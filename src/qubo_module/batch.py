@@ -0,0 +1,128 @@
+"""
+Solving many small models at once. Models are deduplicated on a hash of their coefficients, and the
+distinct ones are dispatched in chunks to a process pool that persists across batches.
+"""
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import hashlib
+import json
+import os
+
+from .brute_force_solver import BruteForceSolver
+from .indexing import index_model
+
+def canonical_model(linear, quadratic) :
+    """ Returns (key, linear, quadratic) for a model. Variables are numbered in the order the solvers
+    index them, duplicate and diagonal terms are merged, and couplings are keyed (low, high), so
+    models that only differ in variable names or term order share a key, and their solutions line up.
+    The returned dicts are keyed by variable number, with every variable listed in the linear dict. """
+    variable_count, _, _, linear_coeffs, quadratic_coeffs = index_model(linear, quadratic)
+    terms = {}
+    for var, coeff in linear_coeffs :
+        terms[var] = terms.get(var, 0.0) + float(coeff)
+    couplings = {}
+    for v1, v2, coeff in quadratic_coeffs :
+        if v1 == v2 :
+            terms[v1] = terms.get(v1, 0.0) + float(coeff)
+        else :
+            pair = (min(v1, v2), max(v1, v2))
+            couplings[pair] = couplings.get(pair, 0.0) + float(coeff)
+
+    linear_terms = { var : terms.get(var, 0.0) for var in range(variable_count) }
+    pairs = sorted(couplings)
+    encoded = json.dumps([list(linear_terms.values()), [[v1, v2, couplings[(v1, v2)]] for v1, v2 in pairs]])
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest(), linear_terms, { pair : couplings[pair] for pair in pairs }
+
+def _solve_chunk(models, engine, engine_options) :
+    return [BruteForceSolver(linear, quadratic, engine=engine, **engine_options).solve() for linear, quadratic in models]
+
+class BatchSolver :
+    """ Solves batches of (linear, quadratic) models on a process pool, which is started on first use
+    and kept until close(). Results are cached by canonical model hash in `cache` (a dict by default,
+    any mapping will do, e.g. to share it between solvers), so identical models are solved once and
+    share one result object. Any extra keyword arguments are passed to each BruteForceSolver. """
+
+    def __init__(self, workers=None, chunk_size=16, cache=None, engine='python', **engine_options) :
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        if self.workers < 1 :
+            raise ValueError(f'Invalid worker count: {self.workers}')
+        if chunk_size < 1 :
+            raise ValueError(f'Invalid chunk size: {chunk_size}')
+        self.chunk_size = chunk_size
+        self.cache = cache if cache is not None else {}
+        self.engine = engine
+        self.engine_options = engine_options
+        self.pool = None
+        self.hits = 0
+        self.misses = 0
+
+    def __enter__(self) :
+        return self
+
+    def __exit__(self, *exc_info) :
+        self.close()
+
+    def close(self) :
+        """ Shuts down the process pool, if it was started """
+        if self.pool is not None :
+            self.pool.shutdown()
+            self.pool = None
+
+    def solve_many(self, models) :
+        """ Yields (index, result) for each model in the iterable, as the results become available.
+        Cached models are yielded straight away, the rest in whatever order their chunks finish. """
+        waiting = {} # Key -> indices of the models waiting on it
+        chunk = [] # (key, linear, quadratic) not yet dispatched
+        running = {} # Future -> keys of its chunk
+        max_running = 4 * self.workers
+
+        for index, (linear, quadratic) in enumerate(models) :
+            key, canonical_linear, canonical_quadratic = canonical_model(linear, quadratic)
+            if key in self.cache :
+                self.hits += 1
+                yield index, self.cache[key]
+                continue
+            if key in waiting :
+                self.hits += 1
+                waiting[key].append(index)
+                continue
+
+            self.misses += 1
+            waiting[key] = [index]
+            chunk.append((key, canonical_linear, canonical_quadratic))
+            if len(chunk) == self.chunk_size :
+                yield from self.__dispatch(chunk, running, waiting)
+                chunk = []
+                while len(running) >= max_running :
+                    yield from self.__collect(running, waiting)
+
+        if chunk :
+            yield from self.__dispatch(chunk, running, waiting)
+        while running :
+            yield from self.__collect(running, waiting)
+
+    def __dispatch(self, chunk, running, waiting) :
+        keys = [key for key, _, _ in chunk]
+        models = [(linear, quadratic) for _, linear, quadratic in chunk]
+        if self.workers == 1 :
+            yield from self.__finish(keys, _solve_chunk(models, self.engine, self.engine_options), waiting)
+            return
+        if self.pool is None :
+            self.pool = ProcessPoolExecutor(self.workers)
+        running[self.pool.submit(_solve_chunk, models, self.engine, self.engine_options)] = keys
+
+    def __collect(self, running, waiting) :
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done :
+            yield from self.__finish(running.pop(future), future.result(), waiting)
+
+    def __finish(self, keys, results, waiting) :
+        for key, result in zip(keys, results) :
+            self.cache[key] = result
+            for index in waiting.pop(key) :
+                yield index, result
+
+def solve_many(models, workers=None, chunk_size=16, cache=None, engine='python', **engine_options) :
+    """ Yields (index, result) for each (linear, quadratic) model, solving them on a process pool that
+    lasts for this call. Use a BatchSolver to keep the pool between calls. """
+    with BatchSolver(workers, chunk_size, cache, engine, **engine_options) as solver :
+        yield from solver.solve_many(models)
@@ -0,0 +1,179 @@
+"""
+A bit-sliced evaluation engine for the brute force solver, for sparse models with integer (or small
+denominator rational) coefficients. The values of a variable over 64 consecutive assignments are
+packed into one uint64 word, so each term is a bitwise AND of words, and the energies of the 64
+lanes are accumulated as binary numbers spread across planes of words.
+"""
+from types import SimpleNamespace
+
+import numpy as np
+
+from .exact import integer_scale, scale_coefficients
+from .vectorized_engine import index_to_solution
+
+LANE_BITS = 6 # log2 of the assignments per word
+ALL_LANES = np.uint64(2**64 - 1)
+# LANE_PATTERNS[s] has lane l set when bit s of l is set, i.e. the values of the variable with shift s
+LANE_PATTERNS = [np.uint64(sum(1 << lane for lane in range(64) if (lane >> shift) & 1)) for shift in range(LANE_BITS)]
+
+class BitSlicedEngine :
+    """ Evaluates assignments 64 to a word, a block of words at a time.
+
+    Assignment index `word * 64 + lane` matches the order of itertools.product, so the last six
+    variables vary across the lanes of a word, and the rest are constant over it. Terms of only those
+    high variables are the same for every lane, and are added to a per-word offset. The remaining
+    terms are added to the lane energies with a bit-sliced ripple carry adder, so the cost per
+    assignment scales with the number of nonzero terms. Ties are exact, since energies are integers.
+
+    Negative terms are added as c + |c| * (1 - term), so every plane holds a non-negative count. """
+    MAX_VARIABLES = 30
+    BLOCK_BITS = 20
+
+    def __init__(self, variable_count, linear_coeffs, quadratic_coeffs, block_bits=None) :
+        self.variable_count = variable_count
+        coefficients = [coeff for _, coeff in linear_coeffs] + [coeff for _, _, coeff in quadratic_coeffs]
+        self.scale = integer_scale(coefficients)
+        if self.scale is None :
+            raise ValueError('The bit sliced engine needs integer coefficients, or rationals with small denominators')
+        linear_coeffs, quadratic_coeffs = scale_coefficients(linear_coeffs, quadratic_coeffs, self.scale)
+
+        # Merge duplicate terms, keyed by their sorted variables
+        terms = {}
+        for var, coeff in linear_coeffs :
+            terms[(var,)] = terms.get((var,), 0) + coeff
+        for v1, v2, coeff in quadratic_coeffs :
+            key = (v1,) if v1 == v2 else (min(v1, v2), max(v1, v2))
+            terms[key] = terms.get(key, 0) + coeff
+
+        self.lane_bits = min(LANE_BITS, variable_count)
+        self.word_bits = variable_count - self.lane_bits # The high variables, constant across a word
+        self.valid_lanes = ALL_LANES if self.lane_bits == LANE_BITS else np.uint64(2**(2**self.lane_bits) - 1)
+
+        self.word_terms = [] # (high variables, coeff)
+        self.lane_terms = [] # (high variables, lane pattern, |coeff|, coeff < 0)
+        self.base_offset = 0
+        for variables, coeff in terms.items() :
+            if coeff == 0 :
+                continue
+            high = tuple(var for var in variables if var < self.word_bits)
+            if len(high) == len(variables) :
+                self.word_terms.append((high, coeff))
+                continue
+            pattern = ALL_LANES
+            for var in variables :
+                if var >= self.word_bits :
+                    pattern &= LANE_PATTERNS[variable_count - 1 - var]
+            self.lane_terms.append((high, pattern, abs(coeff), coeff < 0))
+            if coeff < 0 :
+                self.base_offset += coeff
+
+        magnitude = sum(coeff for _, _, coeff, _ in self.lane_terms)
+        self.plane_count = max(1, magnitude.bit_length())
+
+        if block_bits is None :
+            block_bits = BitSlicedEngine.BLOCK_BITS
+        self.block_words = 2**min(max(block_bits - LANE_BITS, 0), self.word_bits)
+        self.block_count = 2**self.word_bits // self.block_words
+
+    def __high_words(self, first_word) :
+        """ For each high variable, its value over the block's words as an int64 0/1 array """
+        words = first_word + np.arange(self.block_words, dtype=np.int64)
+        return [(words >> (self.word_bits - 1 - var)) & 1 for var in range(self.word_bits)]
+
+    def __add(self, planes, coeff, mask) :
+        """ Adds coeff to the lanes set in mask, rippling the carry up through the planes """
+        carry = None
+        for plane in range(self.plane_count) :
+            bit = (coeff >> plane) & 1
+            if carry is None :
+                if bit :
+                    carry = planes[plane] & mask
+                    planes[plane] ^= mask
+                continue
+            if bit :
+                total = planes[plane] ^ mask
+                carry, planes[plane] = (planes[plane] & mask) | (carry & total), total ^ carry
+            else :
+                carry, planes[plane] = planes[plane] & carry, planes[plane] ^ carry
+            if coeff >> (plane + 1) == 0 and not carry.any() :
+                break
+
+    def __minimum(self, planes, candidates) :
+        """ Returns each word's lowest lane value among the candidate lanes, and the lanes that have it.
+        Working down from the top plane, the candidates narrow to those with a 0 wherever any has one. """
+        value = np.zeros(len(candidates), dtype=np.int64)
+        for plane in range(self.plane_count - 1, -1, -1) :
+            zeros = candidates & ~planes[plane]
+            has_zero = zeros != 0
+            candidates = np.where(has_zero, zeros, candidates)
+            value |= (~has_zero).astype(np.int64) << plane
+        return value, candidates
+
+    def block_minima(self, prefix) :
+        """ Returns (lowest energy, lanes with it, second lowest energy, whether there is one) per word,
+        for the block of words with the given prefix. Energies are scaled integers. """
+        high_words = self.__high_words(prefix * self.block_words)
+        offset = np.full(self.block_words, self.base_offset, dtype=np.int64)
+        for variables, coeff in self.word_terms :
+            active = np.ones(self.block_words, dtype=np.int64)
+            for var in variables :
+                active = active & high_words[var]
+            offset += coeff * active
+
+        planes = [np.zeros(self.block_words, dtype=np.uint64) for _ in range(self.plane_count)]
+        for variables, pattern, coeff, negative in self.lane_terms :
+            mask = np.full(self.block_words, pattern, dtype=np.uint64)
+            for var in variables :
+                mask &= (-high_words[var]).view(np.uint64)
+            if negative :
+                mask = ~mask
+            self.__add(planes, coeff, mask)
+
+        valid = np.full(self.block_words, self.valid_lanes, dtype=np.uint64)
+        lowest, lanes = self.__minimum(planes, valid)
+        rest = valid & ~lanes
+        second, _ = self.__minimum(planes, rest)
+        return lowest + offset, lanes, second + offset, rest != 0
+
+    def solve(self) :
+        """ Returns the same result as BruteForceSolver.solve(), in a single pass """
+        best_obj = None
+        second_best_obj = None
+        solutions = []
+        for prefix in range(self.block_count) :
+            lowest, lanes, second, has_second = self.block_minima(prefix)
+            block_best = int(lowest.min())
+            at_best = lowest == block_best
+            others = np.concatenate([lowest[~at_best], second[at_best & has_second]])
+            block_second = int(others.min()) if len(others) > 0 else None
+
+            # Whichever of the old and new optimum loses becomes a candidate for the second best
+            if best_obj is None or block_best < best_obj :
+                candidates = [best_obj, block_second]
+                best_obj = block_best
+                solutions = []
+            elif block_best == best_obj :
+                candidates = [second_best_obj, block_second]
+            else :
+                candidates = [second_best_obj, block_best]
+            candidates = [value for value in candidates if value is not None]
+            second_best_obj = min(candidates) if candidates else None
+
+            if block_best == best_obj :
+                first_word = prefix * self.block_words
+                for word in np.flatnonzero(at_best) :
+                    mask = int(lanes[word])
+                    for lane in range(64) :
+                        if (mask >> lane) & 1 :
+                            index = ((first_word + int(word)) << self.lane_bits) | lane
+                            solutions.append(index_to_solution(index, self.variable_count))
+
+        result = SimpleNamespace()
+        result.solutions = solutions
+        result.best_obj = best_obj
+        result.second_best_obj = second_best_obj if second_best_obj is not None else best_obj
+        if self.scale != 1 :
+            result.best_obj /= self.scale
+            result.second_best_obj /= self.scale
+        result.gap = result.second_best_obj - result.best_obj
+        return result
@@ -5,13 +5,70 @@ are in the user provided set."""
 
 from types import SimpleNamespace
 
-from ortools.linear_solver import pywraplp
-from ortools.init import pywrapinit
+import numpy as np
 
 from .tile import FullyConnectedTile
+from .tile_mip_embedding import TileMipEmbedder
 
-LP_VAR_LOWER=-100
-LP_VAR_UPPER=100
+BASE_PENALTY = 10
+
+# Reason codes returned by the batch decoder, and the descriptions map_to_element gives for them
+DECODED = 0
+MULTIPLE_INDICATORS = 1
+BITS_MISMATCH = 2
+NO_INDICATOR = 3
+DECODE_REASONS = {
+    DECODED : 'Set membership was successfully enforced',
+    MULTIPLE_INDICATORS : 'Non-optimal solution. Multiple indicator bits are active',
+    BITS_MISMATCH : "Indicator bit doesn't match the elements.",
+    NO_INDICATOR : 'No indicator bit is active, and the set has no zero element',
+}
+
+class ElementDecoder :
+    """ Decodes whole arrays of embedding solutions at once, in a fixed variable order such as a
+    solver's var_name_by_idx. The column of every bit and indicator is looked up once, up front. """
+
+    def __init__(self, module, names) :
+        column_by_name = { name : i for i, name in enumerate(names) }
+        def column(name) :
+            if name not in column_by_name :
+                raise ValueError(f"Variable '{name}' is not in the variable order")
+            return column_by_name[name]
+
+        self.elements = np.array(module.elements, dtype=np.int8).reshape(-1, module.width)
+        ones_count = self.elements.sum(axis=1)
+        # One indicator column per non-zero element, repeated elements included, as map_to_element counts them
+        self.indicator_elements = np.flatnonzero(ones_count > 0)
+        self.indicator_columns = np.array([column(f'indicator_{str(module.elements[i])}') for i in self.indicator_elements],
+                                          dtype=np.int64)
+        self.bit_columns = np.array([column(f'bit_{i}') for i in range(module.width)], dtype=np.int64)
+        zeros = np.flatnonzero(ones_count == 0)
+        self.zero_element = int(zeros[0]) if len(zeros) > 0 else None
+
+    def decode(self, assignments) :
+        """ Takes a (solutions, variables) array and returns (elements, reasons). elements holds the
+        index into module.elements of each row's element, or -1 if the row doesn't decode, and
+        reasons holds DECODED or the code of the first check that failed. """
+        assignments = np.asarray(assignments)
+        active = assignments[:, self.indicator_columns] == 1
+        active_count = active.sum(axis=1)
+
+        elements = np.full(len(assignments), -1, dtype=np.int64)
+        if len(self.indicator_elements) > 0 :
+            elements = np.where(active_count == 1, self.indicator_elements[active.argmax(axis=1)], elements)
+        if self.zero_element is not None :
+            elements = np.where(active_count == 0, self.zero_element, elements)
+
+        selected = self.elements[np.maximum(elements, 0)]
+        mismatch = (selected != assignments[:, self.bit_columns]).any(axis=1)
+
+        reasons = np.full(len(assignments), DECODED, dtype=np.int8)
+        reasons[mismatch] = BITS_MISMATCH
+        if self.zero_element is None :
+            reasons[active_count == 0] = NO_INDICATOR
+        reasons[active_count > 1] = MULTIPLE_INDICATORS
+        elements[reasons != DECODED] = -1
+        return elements, reasons
 
 class BooleanSetModule :
     """ Wraps a set of boolean vectors. Can be embedded onto a tile."""
@@ -55,6 +112,38 @@ class BooleanSetModule :
         self.element_set.add(element_as_int)
         self.elements.append(new_element)
     
+    def map_to_element(self, solution) :
+        """ Maps a solution of the embedding back to the set element it selects. Returns the element
+        (or None if the solution is not a valid one) along with a description. """
+        # Ensure exactly one indicator bit is set.
+        selected_element = None
+        zero_element = None
+        for x in self.elements :
+            if sum(x) == 0 :
+                zero_element = x
+            else :
+                key = f'indicator_{str(x)}'
+                if solution[key] == 1 :
+                    if selected_element is not None :
+                        return None, DECODE_REASONS[MULTIPLE_INDICATORS]
+                    selected_element = x
+
+        if selected_element is None and self.has_zero :
+            selected_element = zero_element
+        
+        # Now we need to make sure that the actual bits match the element
+        for i in range(self.width) :
+            if selected_element[i] != solution[f'bit_{i}'] :
+                return None, DECODE_REASONS[BITS_MISMATCH]
+
+        return selected_element, DECODE_REASONS[DECODED]
+
+    def map_to_elements(self, assignments, names) :
+        """ Batch version of map_to_element, for a (solutions, variables) array with its columns in
+        the given variable name order. Returns (elements, reasons) as ElementDecoder.decode() does.
+        Build an ElementDecoder directly to reuse the column lookup across calls. """
+        return ElementDecoder(self, names).decode(assignments)
+
     def embed(self) :
         """ Simple inefficient embedding, with one qubit per set element """
         model = SimpleNamespace()
@@ -63,32 +152,8 @@ class BooleanSetModule :
         
         # One variable for each of the external bits in the set. If 0 is in the set, we have to do things differently
         if self.has_zero :
-            def map_to_element(solution) :
-                # Ensure exactly one indicator bit is set.
-                selected_element = None
-                zero_element = None
-                for x in self.elements :
-                    if sum(x) == 0 :
-                        zero_element = x
-                    else :
-                        key = f'indicator_{str(x)}'
-                        if solution[key] == 1 :
-                            if selected_element is not None :
-                                return None, 'Non-optimal solution. Multiple indicator bits are active'
-                            selected_element = x
-
-                if selected_element is None and self.has_zero :
-                    selected_element = zero_element
-                
-                # Now we need to make sure that the actual bits match the element
-                for i in range(self.width) :
-                    if selected_element[i] != solution[f'bit_{i}'] :
-                        return None, "Indicator bit doesn't match the elements."
-
-                return selected_element, 'Set membership was successfully enforced'
-            
-            model.map_to_element = map_to_element
-            BASE_PENALTY = 10
+            model.map_to_element = self.map_to_element
+            model.map_to_elements = self.map_to_elements
 
             # Lets start by punishing any bits for being 1
             for i in range(self.width) :
@@ -157,70 +222,79 @@ class BooleanSetModule :
             raise NotImplementedError('Do not currently support bit sets that have no zero element.')
 
         return model
-        
+
+    def embed_compact(self) :
+        """ Builds the same QUBO as embed(), but with integer variable ids and coefficient arrays
+        instead of name-keyed dicts, and without any per-pair python loops.
+
+        Variable id i < width is bit_i, and id width+k is the indicator of the k-th distinct element.
+        Every pair of indicators gets a conflict penalty, so the quadratic arrays still grow with
+        the square of the number of elements, but they are built as arrays of ids. """
+        if not self.has_zero :
+            raise NotImplementedError('Do not currently support bit sets that have no zero element.')
+
+        # Distinct elements, in the order they were given
+        values = np.array(list(dict.fromkeys(int(''.join(str(bit) for bit in x), 2) for x in self.elements)),
+                          dtype=np.int64)
+        element_count = len(values)
+        shifts = np.arange(self.width - 1, -1, -1, dtype=np.int64)
+        bits = ((values[:, None] >> shifts) & 1).astype(np.int8)
+        ones_count = bits.sum(axis=1)
+        indicator_ids = self.width + np.arange(element_count, dtype=np.int32)
+
+        model = SimpleNamespace()
+        model.variable_count = self.width + element_count
+        model.elements = bits
+
+        nonzero = np.flatnonzero(ones_count > 0)
+        model.linear_ids = np.concatenate([np.arange(self.width, dtype=np.int32), indicator_ids[nonzero]])
+        model.linear_coeffs = np.full(len(model.linear_ids), BASE_PENALTY, dtype=np.float64)
+
+        # Bit to indicator couplings, for every non-zero element
+        ones_weight = (ones_count[nonzero] + 1) * BASE_PENALTY / ones_count[nonzero]
+        zeros_weight = ones_weight * self.width
+        bit_ids = np.tile(np.arange(self.width, dtype=np.int32), len(nonzero))
+        bit_indicators = np.repeat(indicator_ids[nonzero], self.width)
+        bit_coeffs = np.where(bits[nonzero] == 0, zeros_weight[:, None], -ones_weight[:, None]).ravel()
+
+        # Indicator conflict penalties. embed() penalizes each non-zero element against every element
+        # that compares lower, which is every lower element value, i.e. every earlier one in sorted order.
+        order = np.argsort(values, kind='stable')
+        later, earlier = np.tril_indices(element_count, -1)
+        higher = order[later].astype(np.int32)
+        lower = order[earlier].astype(np.int32)
+        pair_coeffs = (((ones_count[higher] + 1) * BASE_PENALTY / ones_count[higher]) * self.width)
+
+        model.quadratic_ids = np.concatenate([
+            np.stack([bit_ids, bit_indicators], axis=1),
+            np.stack([indicator_ids[higher], indicator_ids[lower]], axis=1)])
+        model.quadratic_coeffs = np.concatenate([bit_coeffs, pair_coeffs])
+
+        def variable_name(var) :
+            if var < self.width :
+                return f'bit_{var}'
+            return f'indicator_{str([int(bit) for bit in bits[var - self.width]])}'
+
+        def to_dicts() :
+            """ Converts back to the name-keyed linear and quadratic dicts that embed() returns """
+            linear = {variable_name(var) : float(coeff) for var, coeff in zip(model.linear_ids, model.linear_coeffs)}
+            quadratic = {(variable_name(a), variable_name(b)) : float(coeff)
+                         for (a, b), coeff in zip(model.quadratic_ids, model.quadratic_coeffs)}
+            return linear, quadratic
+
+        model.variable_name = variable_name
+        model.to_dicts = to_dicts
+        return model
     
-    def embed_onto_tile_mip(self, tile : FullyConnectedTile) :
-        """ Embeds this boolean set onto the tile, raising an exception if it does not fit on the tile """
+    def embed_onto_tile_mip(self, tile : FullyConnectedTile, embedder : TileMipEmbedder = None) :
+        """ Embeds this boolean set onto the tile, returning the gap and the tile coefficients. Pass an
+        embedder to reuse the tile dependent part of the LP across many sets on the same tile. """
         
         if not self.enable_experimental_mip_embedding :
             raise NotImplementedError("Implementing this MIP based embedding been deferred until we have a working end-to-end case")
-    
-        pywrapinit.CppBridge.InitLogging('basic_example.py')
-        cpp_flags = pywrapinit.CppFlags()
-        cpp_flags.logtostderr = True
-        cpp_flags.log_prefix = False
-        pywrapinit.CppBridge.SetFlags(cpp_flags)
-
-        solver = pywraplp.Solver.CreateSolver('CLP')
-        if not solver:
-            raise RuntimeError('BooleanSetModule was unable to instantiate an instance of CLP solver through ortools.')
-        
-        infinity = solver.infinity()
-        objective = solver.Objective()
-        lp_vars = []
-        for i in range(tile.var_count) :
-            v = solver.NumVar(LP_VAR_LOWER, LP_VAR_UPPER, f'linear_{i}')
-            lp_vars.append( (v, i, i) )
-
-        for i, j in tile.coefficients :
-            v = solver.NumVar(LP_VAR_LOWER, LP_VAR_UPPER, f'quadratic_{i}_{j}')
-            lp_vars.append( (v, i, j) )
-
-        gap_var = solver.NumVar(0, LP_VAR_UPPER, 'gap')
-        objective.SetCoefficient(gap_var, 100) # Maximize the gap!
-        objective.SetMaximization()
-
-        print('Number of variables =', solver.NumVariables())
-
-        solution = [0 for i in range(self.width)]
-        for solution_int in range(2**self.width) :
-            if solution_int in self.element_set :
-                # The RHS here should be 0
-                constraint = solver.Constraint(0, 0, f'constraint_{i}_pass')
-            else :
-                constraint = solver.Constraint(0, infinity, f'constraint_{i}_reject')
-                constraint.SetCoefficient(gap_var, -1) #
-            
-            bit = 1
-            for i in range(self.width) :
-                if (solution_int & bit) == 0 :
-                    solution[i] = 0
-                else :
-                    solution[i] = 1
-                bit = bit << 1
-
-            for var, i, j in lp_vars :
-                if solution[i]*solution[j] == 1:
-                    # This term is active! So lets add it to the constraint
-                    constraint.SetCoefficient(var, 1)
-    
-        solver.Solve()
-
-        print('Solution:')
-        print('  Objective value =', objective.Value())
-        print(f'  gap={gap_var.solution_value()}')
-        
-        for var, i, j in lp_vars :
-            print(f'{var.Name()} = {var.solution_value()} - term ({i}, {j})')
 
-        return {}
+        if embedder is None :
+            embedder = TileMipEmbedder(tile)
+        elif embedder.tile is not tile :
+            raise ValueError('The embedder was built for a different tile')
+        return embedder.embed(self)
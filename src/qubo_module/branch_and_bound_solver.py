@@ -0,0 +1,185 @@
+"""
+Contains an exact depth-first branch-and-bound QUBO solver, for models that are too large to
+enumerate with the brute force solver.
+"""
+from types import SimpleNamespace
+import math
+
+from .indexing import index_model
+
+class BranchAndBoundSolver :
+    """ Solve a QUBO problem instance exactly by branch-and-bound. Takes the same model and returns
+    the same result as BruteForceSolver, so the two can be swapped for one another.
+
+    Before the main search, the minimum energy of the model restricted to each suffix of the branching
+    order is found, shortest suffix first, each search bounded by the ones before it. The free
+    variables at a node are such a suffix, so their energy is at least its minimum plus whatever the
+    fixed variables can take off through their couplings. """
+
+    def __init__(self, linear, quadratic):
+        self.model = { 'linear' : linear, 'quadratic' : quadratic }
+        (self.variable_count, self.var_idx_by_name, self.var_name_by_idx,
+            self.linear_coeffs, self.quadratic_coeffs) = index_model(linear, quadratic)
+
+        self.linear = [0 for _ in range(self.variable_count)]
+        self.neighbours = [dict() for _ in range(self.variable_count)]
+        for var, coeff in self.linear_coeffs :
+            self.linear[var] += coeff
+        for v1, v2, coeff in self.quadratic_coeffs :
+            if v1 == v2 :
+                self.linear[v1] += coeff
+            else :
+                self.neighbours[v1][v2] = self.neighbours[v1].get(v2, 0) + coeff
+                self.neighbours[v2][v1] = self.neighbours[v2].get(v1, 0) + coeff
+
+        self.order = self.__branching_order()
+        position = [0 for _ in range(self.variable_count)]
+        for i, var in enumerate(self.order) :
+            position[var] = i
+
+        # Negative couplings are listed once, under whichever variable is branched on first
+        self.negative = [[] for _ in range(self.variable_count)]
+        for var in range(self.variable_count) :
+            for other, coeff in self.neighbours[var].items() :
+                if coeff < 0 and position[other] > position[var] :
+                    self.negative[var].append((other, coeff))
+
+    def __branching_order(self) :
+        """ Branches on the variables with the most neighbours first, since fixing them settles the
+        fields of the most other variables. Ties go to the variable most strongly coupled to the ones
+        already placed. """
+        attachment = [0 for _ in range(self.variable_count)]
+        remaining = set(range(self.variable_count))
+        order = []
+        while remaining :
+            var = max(remaining, key=lambda v: (attachment[v], len(self.neighbours[v]), -v))
+            remaining.remove(var)
+            order.append(var)
+            for other, coeff in self.neighbours[var].items() :
+                attachment[other] += abs(coeff)
+        return order
+
+    def solve(self) :
+        """ Returns the set of optimal solutions to the QUBO, the optimal energy, as well as
+        the gap between optimal and non-optimal solutions."""
+        self.nodes = 0
+        self.__suffix_minima()
+
+        self.best = None
+        self.second = math.inf
+        self.highest = None
+        self.optimal = []
+        solution = [0 for _ in range(self.variable_count)]
+        self.__branch(0, solution, list(self.linear), 0)
+
+        result = SimpleNamespace()
+        result.solutions = sorted(self.optimal)
+        result.best_obj = self.best
+        # If nothing was ever pruned or rejected, every assignment is tied with the optimum
+        result.second_best_obj = self.second if self.second != math.inf else self.highest
+        result.gap = result.second_best_obj - result.best_obj
+        result.nodes = self.nodes
+        return result
+
+    def __suffix_minima(self) :
+        """ suffix_min[d] is the minimum energy of the model restricted to the variables from depth d
+        of the branching order on, with their own linear terms """
+        self.suffix_min = [-math.inf for _ in range(self.variable_count)] + [0]
+        for start in range(self.variable_count - 1, -1, -1) :
+            self.suffix_best = math.inf
+            self.__minimize(start, list(self.linear), 0)
+            self.suffix_min[start] = self.suffix_best
+
+    def __minimize(self, depth, fields, energy) :
+        """ Branches like __branch, but only looks for a lower minimum """
+        self.nodes += 1
+        if depth == self.variable_count :
+            self.suffix_best = min(self.suffix_best, energy)
+            return
+        if self.__lower_bound(depth, fields, energy) >= self.suffix_best :
+            return
+
+        var = self.order[depth]
+        if fields[var] < 0 :
+            self.__minimize(depth + 1, self.__set(var, fields), energy + fields[var])
+            self.__minimize(depth + 1, fields, energy)
+        else :
+            self.__minimize(depth + 1, fields, energy)
+            self.__minimize(depth + 1, self.__set(var, fields), energy + fields[var])
+
+    def __set(self, var, fields) :
+        """ The fields of the free variables once var is set to 1 """
+        child_fields = list(fields)
+        for other, coeff in self.neighbours[var].items() :
+            child_fields[other] += coeff
+        return child_fields
+
+    def __lower_bound(self, depth, fields, energy) :
+        """ The better of two bounds on the energy of any completion.
+
+        Every negative coupling between two free variables is charged to one of its endpoints, and
+        each free variable contributes min(0, field + charged couplings). Any split of the couplings
+        gives a valid bound, so each one goes to the endpoint with the most slack.
+
+        The free variables are also a suffix of the branching order, whose minimum on its own is known,
+        and the fixed variables can only lower that by the negative parts of their contributions to
+        the free fields. """
+        free = self.order[depth:]
+        residual = {var : fields[var] for var in free}
+        for var in free :
+            for other, coeff in self.negative[var] :
+                if other in residual :
+                    if residual[var] >= residual[other] :
+                        residual[var] += coeff
+                    else :
+                        residual[other] += coeff
+
+        bound = energy
+        suffix_bound = energy + self.suffix_min[depth]
+        for var, value in residual.items() :
+            if value < 0 :
+                bound += value
+            contribution = fields[var] - self.linear[var]
+            if contribution < 0 :
+                suffix_bound += contribution
+        return max(bound, suffix_bound)
+
+    def __record(self, solution, energy) :
+        if self.highest is None or energy > self.highest :
+            self.highest = energy
+
+        if self.best is None :
+            self.best = energy
+            self.optimal = [tuple(solution)]
+        elif math.isclose(energy, self.best, rel_tol=1e-6) :
+            self.optimal.append(tuple(solution))
+        elif energy < self.best :
+            self.second = min(self.second, self.best)
+            self.best = energy
+            self.optimal = [tuple(solution)]
+        else :
+            self.second = min(self.second, energy)
+
+    def __branch(self, depth, solution, fields, energy) :
+        """ fields[v] is the change in energy from setting free variable v to 1, given the variables
+        fixed so far. energy is the energy of the fixed variables. """
+        self.nodes += 1
+        if depth == self.variable_count :
+            self.__record(solution, energy)
+            return
+
+        # The subtree only matters if it could hold a solution tied with the best (which is below the
+        # second best), or a new second best
+        if self.__lower_bound(depth, fields, energy) >= self.second :
+            return
+
+        var = self.order[depth]
+        # Try the locally preferred value first, so good solutions tighten the bound early
+        values = (1, 0) if fields[var] < 0 else (0, 1)
+        for value in values :
+            if value == 0 :
+                self.__branch(depth + 1, solution, fields, energy)
+            else :
+                solution[var] = 1
+                self.__branch(depth + 1, solution, self.__set(var, fields), energy + fields[var])
+                solution[var] = 0
@@ -1,60 +1,136 @@
 """
 Contains the brute force QUBO solver and its utilities.
 """
+import importlib
 import itertools
 from types import SimpleNamespace
 import math
+import time
+
+from .conditional import FreeSubspace
+from .exact import integer_scale, scale_coefficients
+from .indexing import index_model
+from . import levels
+from .preprocessing import solve_preprocessed
+from .vectorized_engine import VectorizedEngine
+
+# Engines are 'module:attribute' paths, only imported when first used, like the solvers of the registry
+ENGINES = {
+    'bit_sliced' : 'qubo_module.bit_sliced_engine:BitSlicedEngine',
+    'gray_code' : 'qubo_module.gray_code_engine:GrayCodeEngine',
+    'parallel' : 'qubo_module.parallel_engine:ParallelEngine',
+    'vectorized' : 'qubo_module.vectorized_engine:VectorizedEngine',
+}
+
+def engine_class(name) :
+    """ Imports and returns the class of an engine from ENGINES """
+    module_name, attribute = ENGINES[name].split(':')
+    return getattr(importlib.import_module(module_name), attribute)
 
 class BruteForceSolver :
-    """ Solve a QUBO problem instance by brute force. """
+    """ Solve a QUBO problem instance by brute force. The default 'python' engine evaluates one
+    assignment at a time, other engines from ENGINES can be selected by name. Any extra keyword
+    arguments are passed through to the engine, e.g. workers=4 for the parallel engine.
+
+    With instrument=True, solve() attaches a `profile` to its result, with per-phase timings and
+    evaluation counts. progress, if given, is called as progress(phase, evaluated, total) about every
+    progress_interval assignments. Neither costs anything when left disabled. The python engine in
+    exact mode makes a single 'solve' pass rather than separate optimum and solution passes.
+
+    With preprocess=True, solve() first fixes variables whose optimal value follows from their
+    coefficients, then solves each connected component of the rest separately with the selected
+    engine. The variable limit then applies per component rather than to the whole model. Progress
+    is then reported per component solve, and the profile sums their timings and evaluation counts,
+    with the time spent outside them as a 'preprocessing' phase.
+
+    With exact=True, coefficients that are integers or rationals with small denominators are scaled
+    to integers (exact=<scale> gives the scale explicitly), energies are evaluated in integer
+    arithmetic, and degeneracy is plain equality rather than a relative tolerance. """
     MAX_VARIABLES = 16
+    PHASED_ENGINES = ('python', 'vectorized')
+    EXACT_ENGINES = ('python', 'vectorized')
 
-    def __init__(self, linear, quadratic):
+    def __init__(self, linear, quadratic, engine='python', instrument=False, progress=None, progress_interval=2**16,
+                 preprocess=False, exact=False, **engine_options):
+        self.instrument = instrument or progress is not None
+        if self.instrument :
+            start = time.perf_counter()
+        if progress is not None and engine not in BruteForceSolver.PHASED_ENGINES :
+            raise ValueError(f"Progress reporting is not supported by the '{engine}' engine")
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self.engine_name = engine
+        if engine != 'python' and engine not in ENGINES :
+            raise ValueError(f"Unknown engine '{engine}'")
+        if engine == 'python' and engine_options :
+            raise ValueError("The 'python' engine does not take any options")
+        if exact and engine not in BruteForceSolver.EXACT_ENGINES :
+            raise ValueError(f"Exact mode is not supported by the '{engine}' engine")
+        self.preprocess = preprocess
+        self.engine_options = engine_options
         self.model = { 'linear' : linear, 'quadratic' : quadratic }
-        self.variable_count = 0
-        self.var_idx_by_name = {}
-        self.var_name_by_idx = []
-        self.linear_coeffs = []
-        self.quadratic_coeffs = []
-
-        for key in linear :
-            variable = self.__process_var(key)
-            self.linear_coeffs.append((variable, linear[key]))
-
-        for key in quadratic :
-            a, b = key
-            v1 = self.__process_var(a)
-            v2 = self.__process_var(b)
-            self.quadratic_coeffs.append((v1, v2, quadratic[key]))
-
-        if self.variable_count > BruteForceSolver.MAX_VARIABLES :
+        (self.variable_count, self.var_idx_by_name, self.var_name_by_idx,
+            self.linear_coeffs, self.quadratic_coeffs) = index_model(linear, quadratic)
+
+        self.scale = None
+        if exact :
+            coefficients = [coeff for _, coeff in self.linear_coeffs] + [coeff for _, _, coeff in self.quadratic_coeffs]
+            self.scale = integer_scale(coefficients) if exact is True else exact
+            if self.scale is None :
+                raise ValueError('Coefficients are not integers or rationals with small denominators, '
+                    + 'pass the scale as exact=<scale>')
+            self.exact_linear_coeffs, self.exact_quadratic_coeffs = scale_coefficients(
+                self.linear_coeffs, self.quadratic_coeffs, self.scale)
+
+        max_variables = BruteForceSolver.MAX_VARIABLES
+        self.engine = None
+        if engine != 'python' :
+            max_variables = engine_class(engine).MAX_VARIABLES
+
+        if self.variable_count > max_variables and not preprocess :
             raise ValueError(f'Too many variables! ${self.variable_count} variables found, '
-                + f'max is ${BruteForceSolver.MAX_VARIABLES}.')
+                + f'max is ${max_variables}.')
 
-    def __process_var(self, var_name) :
-        if not var_name in self.var_idx_by_name :
-            self.var_idx_by_name[var_name] = self.variable_count
-            self.var_name_by_idx.append(var_name)
-            self.variable_count += 1
-        return self.var_idx_by_name[var_name]
+        if engine != 'python' and not preprocess :
+            if self.scale is not None :
+                self.engine = engine_class(engine)(self.variable_count, self.exact_linear_coeffs, self.exact_quadratic_coeffs,
+                                              exact=True, **engine_options)
+            else :
+                self.engine = engine_class(engine)(self.variable_count, self.linear_coeffs, self.quadratic_coeffs, **engine_options)
+
+        if self.instrument :
+            self.indexing_time = time.perf_counter() - start
 
     # Returns the optimal solution
     def solve(self) :
         """ Returns the set of optimal solutions to the QUBO, the optimal energy, as well as 
         the gap between optimal and non-optimal solutions."""
+        if self.instrument :
+            return self.__solve_instrumented()
+        if self.preprocess :
+            return self.__solve_preprocessed()
+        if self.scale is not None :
+            return self.__solve_exact()
+        if self.engine is not None :
+            return self.engine.solve()
+        return self.__solve_python()
+
+    def __solve_python(self, step=None) :
+        """ The two pass solve of the 'python' engine. step, if given, is called as step(phase, evaluated)
+        every progress_interval assignments and at the end of each pass. """
         result = SimpleNamespace()
         result.solutions = []
         result.best_obj = 0
         result.second_best_obj = 0
 
         # First pass to calculate the optimal objective
-        for solution in itertools.product([0,1], repeat=self.variable_count) :
+        for solution in self.__assignments('optimum_pass', step) :
             obj = self.__evaluate(solution)
             result.best_obj = min(result.best_obj, obj)
             result.second_best_obj = max(result.second_best_obj, obj) # Needed for upper bound
 
         # Second pass to construct the optimal solution set, and the gap
-        for solution in itertools.product([0,1], repeat=self.variable_count) :
+        for solution in self.__assignments('solution_pass', step) :
             obj = self.__evaluate(solution)
             if math.isclose(obj, result.best_obj, rel_tol=1e-6) :
                 result.solutions.append(solution)
@@ -64,7 +140,121 @@ class BruteForceSolver :
         result.gap = result.second_best_obj - result.best_obj
         # We need to actually implement something here
         return result
+
+    def __assignments(self, phase, step) :
+        """ Every assignment in enumeration order, calling step along the way if it is given """
+        assignments = itertools.product([0,1], repeat=self.variable_count)
+        if step is None :
+            return assignments
+        return self.__stepped_assignments(assignments, phase, step)
+
+    def __stepped_assignments(self, assignments, phase, step) :
+        total = 2**self.variable_count
+        for evaluated, solution in enumerate(assignments, 1) :
+            yield solution
+            if evaluated % self.progress_interval == 0 or evaluated == total :
+                step(phase, evaluated)
     
+    def __solve_exact(self, step=None) :
+        """ Same as solve(), but on the integer scaled coefficients. With exact comparisons the python
+        engine only needs a single pass, which step sees as the 'solve' phase. """
+        if self.engine is not None :
+            result = self.engine.solve(step)
+        else :
+            linear, quadratic = self.exact_linear_coeffs, self.exact_quadratic_coeffs
+            result = SimpleNamespace()
+            result.solutions = []
+            result.best_obj = None
+            result.second_best_obj = None
+            for solution in self.__assignments('solve', step) :
+                obj = sum(solution[var] * coeff for var, coeff in linear) \
+                    + sum(solution[v1] * solution[v2] * coeff for v1, v2, coeff in quadratic)
+                if result.best_obj is None or obj < result.best_obj :
+                    # The old optimum was below everything else seen, so it is now the second best
+                    result.second_best_obj = result.best_obj
+                    result.best_obj = obj
+                    result.solutions = [solution]
+                elif obj == result.best_obj :
+                    result.solutions.append(solution)
+                elif result.second_best_obj is None or obj < result.second_best_obj :
+                    result.second_best_obj = obj
+            if result.second_best_obj is None :
+                result.second_best_obj = result.best_obj
+
+        if self.scale != 1 :
+            result.best_obj /= self.scale
+            result.second_best_obj /= self.scale
+        result.gap = result.second_best_obj - result.best_obj
+        result.scale = self.scale
+        return result
+
+    def __solve_preprocessed(self, profile=None) :
+        """ Same as solve(), but solving the components left by preprocessing one at a time. With a
+        profile, the components are solved instrumented and their profiles are added to it. """
+        start = time.perf_counter()
+        solving = [0] # Time spent in component solves
+        def solve_component(linear, quadratic) :
+            component = BruteForceSolver(linear, quadratic, engine=self.engine_name, exact=self.scale or False,
+                                         instrument=profile is not None, progress=self.progress,
+                                         progress_interval=self.progress_interval, **self.engine_options).solve()
+            if profile is not None :
+                for phase, elapsed in component.profile.phases.items() :
+                    profile.phases[phase] = profile.phases.get(phase, 0) + elapsed
+                profile.assignments_evaluated += component.profile.assignments_evaluated
+                solving[0] += component.profile.solve_time + component.profile.phases['model_indexing']
+            return component
+        result = solve_preprocessed(self.variable_count, self.linear_coeffs, self.quadratic_coeffs, solve_component)
+        if profile is not None :
+            profile.phases['preprocessing'] = time.perf_counter() - start - solving[0]
+        result.fixed = { self.var_name_by_idx[var] : value for var, value in result.fixed.items() }
+        return result
+
+    def __solve_instrumented(self) :
+        """ Same as solve(), but timing each phase and reporting progress """
+        profile = SimpleNamespace()
+        profile.phases = { 'model_indexing' : self.indexing_time }
+        total = 2**self.variable_count
+        start = time.perf_counter()
+
+        phase_start = [start]
+        reported = {} # Phase -> the last evaluated count reported for it
+        def step(phase, evaluated) :
+            # Reports each time the count crosses a multiple of the interval, and at the end of the phase
+            if self.progress is not None :
+                last = reported.get(phase, 0)
+                if evaluated // self.progress_interval > last // self.progress_interval \
+                        or (evaluated == total and last != total) :
+                    self.progress(phase, evaluated, total)
+                    reported[phase] = evaluated
+            if evaluated == total :
+                now = time.perf_counter()
+                profile.phases[phase] = now - phase_start[0]
+                phase_start[0] = now
+
+        if self.preprocess :
+            profile.assignments_evaluated = 0
+            result = self.__solve_preprocessed(profile)
+        elif self.scale is not None :
+            result = self.__solve_exact(step)
+            profile.assignments_evaluated = total * (2 if self.engine is not None else 1)
+        elif self.engine_name == 'python' :
+            result = self.__solve_python(step)
+            profile.assignments_evaluated = 2 * total
+        elif self.engine_name == 'vectorized' :
+            result = self.engine.solve(step)
+            profile.assignments_evaluated = 2 * total
+        else :
+            # Other engines don't expose their passes, so they are timed as a single phase
+            result = self.engine.solve()
+            profile.phases['solve'] = time.perf_counter() - start
+            profile.assignments_evaluated = total * (1 if self.engine_name in ('gray_code', 'bit_sliced') else 2)
+
+        elapsed = time.perf_counter() - start
+        profile.solve_time = elapsed
+        profile.evaluations_per_second = profile.assignments_evaluated / elapsed if elapsed > 0 else None
+        result.profile = profile
+        return result
+
     def for_each_solution(self, fn) :
         """ Iterates all the solutions to the model """
         for solution in itertools.product([0,1], repeat=self.variable_count) :
@@ -74,6 +264,79 @@ class BruteForceSolver :
                 mapped_solution[ self.var_name_by_idx[i] ] = solution[i]
             fn(mapped_solution, obj)
 
+    def iter_solution_chunks(self, chunk_size=2**16, max_energy=None, optimal_only=False) :
+        """ Yields all the solutions to the model in chunks of at most chunk_size assignments, without
+        building a dict per solution. Each chunk has `indices`, `assignments` (an int8 array with one
+        column per variable, in var_name_by_idx order) and `energies`. Chunks can be filtered to
+        energies <= max_energy, or to the optimal solutions only, in which case the optimum is found
+        with a first pass over the blocks once iteration starts.
+
+        The configured vectorized engine is used when its block size matches chunk_size. In exact mode
+        energies are evaluated on the integer scaled coefficients, and reported unscaled like solve(). """
+        if chunk_size < 1 or chunk_size & (chunk_size - 1) != 0 :
+            raise ValueError(f'chunk_size must be a power of two, got {chunk_size}')
+
+        engine = self.__block_engine(chunk_size.bit_length() - 1)
+        scale = self.scale or 1
+        best_obj = None
+        if optimal_only :
+            best_obj, _ = engine.energy_bounds(range(engine.block_count))
+        if max_energy is not None :
+            max_energy = max_energy * scale
+        for chunk in engine.chunks(max_energy=max_energy, best_obj=best_obj) :
+            if scale != 1 :
+                chunk.energies = chunk.energies / scale
+            yield chunk
+
+    def solve_top_k(self, k, max_solutions_per_level=None) :
+        """ Returns the k lowest distinct energy levels in `levels`, each with its energy, count and
+        (at most max_solutions_per_level) solutions, in a single pass with bounded memory. The usual
+        solutions, best_obj, second_best_obj and gap fields are filled in from the levels. """
+        return levels.top_k_levels(self.__block_engine(), k, max_solutions_per_level, self.scale or 1)
+
+    def prove_gap(self, gap) :
+        """ Decides whether the gap between the optimal and second best energies is at least `gap`,
+        stopping early if the claim can be disproven before every assignment is evaluated. Returns
+        `proven`, `settled_early`, the number of assignments `evaluated` and the energies seen. """
+        return levels.prove_gap(self.__block_engine(), gap, self.scale or 1)
+
+    def solve_clamped(self, assignments) :
+        """ Returns a result per partial assignment, where each partial assignment is a dict of variable
+        name to 0/1. The clamped variables are folded into the linear terms and a constant offset, and
+        only the remaining free variables are enumerated. Assignments that clamp the same variables
+        share one precomputed free subspace. Solutions include the clamped values. """
+        assignments = list(assignments)
+        results = [None for _ in assignments]
+        groups = {}
+        for position, assignment in enumerate(assignments) :
+            for name, value in assignment.items() :
+                if name not in self.var_idx_by_name :
+                    raise ValueError(f"Unknown variable '{name}'")
+                if value not in (0, 1) :
+                    raise ValueError(f"Variable '{name}' can only be clamped to 0 or 1, not {value}")
+            clamped = tuple(sorted(self.var_idx_by_name[name] for name in assignment))
+            groups.setdefault(clamped, []).append(position)
+
+        for clamped, positions in groups.items() :
+            subspace = FreeSubspace(self.variable_count, self.linear_coeffs, self.quadratic_coeffs, clamped)
+            names = [self.var_name_by_idx[var] for var in clamped]
+            values = [[assignments[position][name] for name in names] for position in positions]
+            for position, result in zip(positions, subspace.solve_batch(values)) :
+                results[position] = result
+        return results
+
+    def __block_engine(self, block_bits=None) :
+        """ A vectorized engine for the level modes and chunk iteration, which is the configured one
+        if it has the requested block size. In exact mode it evaluates the integer scaled coefficients,
+        so its energies are multiplied by self.scale. """
+        if isinstance(self.engine, VectorizedEngine) \
+                and (block_bits is None or min(block_bits, self.variable_count) == self.engine.block_bits) :
+            return self.engine
+        if self.scale is not None :
+            return VectorizedEngine(self.variable_count, self.exact_linear_coeffs, self.exact_quadratic_coeffs,
+                                    block_bits=block_bits, exact=True)
+        return VectorizedEngine(self.variable_count, self.linear_coeffs, self.quadratic_coeffs, block_bits=block_bits)
+
     def __evaluate(self, solution) :
         energy = 0
         for var, coeff in self.linear_coeffs :
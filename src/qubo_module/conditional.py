@@ -0,0 +1,74 @@
+"""
+Conditional solving - the minimum energy of a model given values for some of its variables. The
+clamped variables are folded into the linear terms of the free ones and a constant offset, so each
+partial assignment only costs a solve of the free subspace, and the structure of that subspace is
+shared by the whole batch.
+"""
+from types import SimpleNamespace
+
+import numpy as np
+
+from .vectorized_engine import assignment_bits, dense_model, index_to_solution, isclose
+
+class FreeSubspace :
+    """ The free part of a model once the variables in `clamped` are given values. Energies of the
+    2**free assignments are evaluated for a whole batch of clamped values at once. """
+    MAX_FREE_VARIABLES = 20
+    BATCH_BYTES = 2**27 # Bounds the size of the (assignments x batch) energy matrix
+
+    def __init__(self, variable_count, linear_coeffs, quadratic_coeffs, clamped) :
+        self.variable_count = variable_count
+        self.clamped = list(clamped)
+        clamped_set = set(self.clamped)
+        self.free = [var for var in range(variable_count) if var not in clamped_set]
+        if len(self.free) > FreeSubspace.MAX_FREE_VARIABLES :
+            raise ValueError(f'Too many free variables! {len(self.free)} variables are not clamped, '
+                + f'max is {FreeSubspace.MAX_FREE_VARIABLES}.')
+
+        linear, upper = dense_model(variable_count, linear_coeffs, quadratic_coeffs)
+        symmetric = upper + upper.T
+        self.clamped_linear = linear[self.clamped]
+        self.clamped_upper = upper[np.ix_(self.clamped, self.clamped)]
+        self.free_linear = linear[self.free]
+        self.cross = symmetric[np.ix_(self.clamped, self.free)] # What each clamped variable adds to the free fields
+
+        self.bits = assignment_bits(2**len(self.free), len(self.free)).astype(np.float64)
+        free_upper = upper[np.ix_(self.free, self.free)]
+        self.free_quadratic = ((self.bits @ free_upper) * self.bits).sum(axis=1)
+
+    def solve_batch(self, values) :
+        """ Solves the free subspace for each row of a (batch, clamped) array of 0/1 values, returning
+        a result per row with the same fields as BruteForceSolver.solve(). Solutions are full
+        assignments, with the clamped values filled in. """
+        values = np.asarray(values, dtype=np.float64).reshape(len(values), len(self.clamped))
+        offsets = values @ self.clamped_linear + ((values @ self.clamped_upper) * values).sum(axis=1)
+        fields = self.free_linear + values @ self.cross
+
+        results = []
+        rows_per_batch = max(1, FreeSubspace.BATCH_BYTES // (8 * len(self.bits)))
+        for start in range(0, len(values), rows_per_batch) :
+            end = start + rows_per_batch
+            energies = self.free_quadratic[:, None] + self.bits @ fields[start:end].T + offsets[start:end]
+            for column in range(energies.shape[1]) :
+                results.append(self.__result(values[start + column], energies[:, column]))
+        return results
+
+    def __result(self, clamped_values, energies) :
+        result = SimpleNamespace()
+        result.best_obj = float(energies.min())
+        optimal = isclose(energies, result.best_obj)
+        if optimal.all() :
+            result.second_best_obj = float(energies.max())
+        else :
+            result.second_best_obj = float(energies[~optimal].min())
+        result.gap = result.second_best_obj - result.best_obj
+
+        result.solutions = []
+        for index in np.flatnonzero(optimal) :
+            solution = [0 for _ in range(self.variable_count)]
+            for var, bit in zip(self.free, index_to_solution(int(index), len(self.free))) :
+                solution[var] = bit
+            for var, value in zip(self.clamped, clamped_values) :
+                solution[var] = int(value)
+            result.solutions.append(tuple(solution))
+        return result
@@ -0,0 +1,140 @@
+"""
+A cache for BooleanSetModule embeddings. Sets that are bit permutations of each other share one
+cache entry, keyed on a canonical form of the element set, and the cached coefficients are mapped
+back onto the caller's bit order.
+"""
+from collections import OrderedDict
+from types import SimpleNamespace
+import hashlib
+import itertools
+import json
+import math
+import os
+
+import numpy as np
+
+from .boolean_set_module import BooleanSetModule
+
+# Canonicalization tries every ordering of bits that its column invariants can't tell apart, as long
+# as there are at most this many. Past that, the key is still exact, it just may not be canonical.
+MAX_CANONICAL_PERMUTATIONS = 5040
+
+def canonical_form(module) :
+    """ Returns (key, permutation) for the module's element set. Canonical element c has
+    c[j] = x[permutation[j]] for caller element x, and key is the sorted tuple of canonical element
+    values along with the width. Permutations of the same set share the same key. """
+    width = module.width
+    values = np.array(sorted(module.element_set), dtype=np.int64)
+    shifts = np.arange(width - 1, -1, -1, dtype=np.int64)
+    bits = (values[:, None] >> shifts) & 1
+
+    # Column invariants - the ones count of the column, and the popcounts of the rows it is set in
+    popcounts = bits.sum(axis=1)
+    invariants = [(int(bits[:, i].sum()), tuple(sorted(popcounts[bits[:, i] == 1].tolist()))) for i in range(width)]
+    columns = sorted(range(width), key=lambda i: invariants[i], reverse=True)
+    groups = [list(group) for _, group in itertools.groupby(columns, key=lambda i: invariants[i])]
+
+    if math.prod(math.factorial(len(group)) for group in groups) <= MAX_CANONICAL_PERMUTATIONS :
+        candidates = (sum((list(p) for p in choice), []) for choice in
+                      itertools.product(*[itertools.permutations(group) for group in groups]))
+    else :
+        candidates = [columns]
+
+    weights = np.left_shift(1, shifts)
+    best_key = None
+    best_permutation = None
+    for permutation in candidates :
+        key = tuple(sorted((bits[:, permutation] @ weights).tolist()))
+        if best_key is None or key < best_key :
+            best_key = key
+            best_permutation = permutation
+    return (width, best_key), tuple(best_permutation)
+
+class EmbeddingCache :
+    """ An LRU cache of boolean set embeddings, with an optional on-disk store in `path` that persists
+    across runs. Use cache.embed(module) in place of module.embed(). """
+
+    def __init__(self, max_entries=1024, path=None) :
+        if max_entries < 1 :
+            raise ValueError(f'Invalid max_entries: {max_entries}')
+        self.max_entries = max_entries
+        self.path = path
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if path is not None :
+            os.makedirs(path, exist_ok=True)
+
+    def embed(self, module) :
+        """ Returns the same kind of model as module.embed(), computed at most once per canonical set.
+        The coefficients are those of embed() on the canonical bit ordering, relabelled onto the
+        module's own bit order. """
+        key, permutation = canonical_form(module)
+        entry = self.__lookup(key)
+        if entry is None :
+            self.misses += 1
+            entry = self.__compute(key)
+            self.__store(key, entry)
+        else :
+            self.hits += 1
+        return self.__remap(module, entry, permutation)
+
+    def __file(self, key) :
+        digest = hashlib.sha256(json.dumps(key).encode()).hexdigest()
+        return os.path.join(self.path, f'{digest}.json')
+
+    def __lookup(self, key) :
+        if key in self.entries :
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        if self.path is not None and os.path.exists(self.__file(key)) :
+            with open(self.__file(key), encoding='utf-8') as file :
+                stored = json.load(file)
+            if tuple(stored['key'][1]) == key[1] and stored['key'][0] == key[0] :
+                entry = stored['entry']
+                self.__remember(key, entry)
+                return entry
+        return None
+
+    def __store(self, key, entry) :
+        self.__remember(key, entry)
+        if self.path is not None :
+            # Write then rename, so concurrent runs never see a partial file
+            temp = self.__file(key) + f'.{os.getpid()}.tmp'
+            with open(temp, 'w', encoding='utf-8') as file :
+                json.dump({'key' : key, 'entry' : entry}, file)
+            os.replace(temp, self.__file(key))
+
+    def __remember(self, key, entry) :
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries :
+            self.entries.popitem(last=False)
+
+    @staticmethod
+    def __compute(key) :
+        width, values = key
+        canonical = BooleanSetModule('|'.join(format(value, f'0{width}b') for value in values))
+        compact = canonical.embed_compact()
+        return {
+            'elements' : list(values),
+            'linear' : [[int(var), float(coeff)] for var, coeff in zip(compact.linear_ids, compact.linear_coeffs)],
+            'quadratic' : [[int(a), int(b), float(coeff)] for (a, b), coeff in zip(compact.quadratic_ids, compact.quadratic_coeffs)],
+        }
+
+    @staticmethod
+    def __remap(module, entry, permutation) :
+        width = module.width
+        names = [f'bit_{permutation[j]}' for j in range(width)]
+        for value in entry['elements'] :
+            element = [0 for _ in range(width)]
+            for j in range(width) :
+                element[permutation[j]] = (value >> (width - 1 - j)) & 1
+            names.append(f'indicator_{str(element)}')
+
+        model = SimpleNamespace()
+        model.linear = {names[var] : coeff for var, coeff in entry['linear']}
+        model.quadratic = {(names[a], names[b]) : coeff for a, b, coeff in entry['quadratic']}
+        model.map_to_element = module.map_to_element
+        model.map_to_elements = module.map_to_elements
+        return model
@@ -0,0 +1,119 @@
+"""
+Verifies that an embedding enforces its boolean set, by minimizing over the internal variables for
+each assignment of the external variables instead of enumerating every variable.
+"""
+from types import SimpleNamespace
+
+import numpy as np
+
+from .branch_and_bound_solver import BranchAndBoundSolver
+from .vectorized_engine import assignment_bits, isclose
+
+# Internal subproblems up to this size are enumerated directly, larger ones use branch-and-bound
+ENUMERATE_INTERNAL_LIMIT = 12
+
+def external_minimum_energies(linear, quadratic, external_names) :
+    """ Returns an array with the minimum energy over all internal variables, for each of the
+    2**len(external_names) external assignments in itertools.product order. Any variable that isn't
+    named in external_names is internal. """
+    external_idx = {name : i for i, name in enumerate(external_names)}
+    internal_idx = {}
+    for name in list(linear) + [name for key in quadratic for name in key] :
+        if name not in external_idx and name not in internal_idx :
+            internal_idx[name] = len(internal_idx)
+
+    width = len(external_names)
+    internal_count = len(internal_idx)
+    external_linear = np.zeros(width)
+    external_upper = np.zeros((width, width))
+    internal_linear = np.zeros(internal_count)
+    coupling = np.zeros((width, internal_count)) # external-internal couplings
+    internal_quadratic = {}
+    internal_upper = np.zeros((internal_count, internal_count))
+
+    for name, coeff in linear.items() :
+        if name in external_idx :
+            external_linear[external_idx[name]] += coeff
+        else :
+            internal_linear[internal_idx[name]] += coeff
+
+    for (a, b), coeff in quadratic.items() :
+        if a in internal_idx and b in external_idx :
+            a, b = b, a
+        if a in external_idx and b in external_idx :
+            i, j = sorted((external_idx[a], external_idx[b]))
+            if i == j :
+                external_linear[i] += coeff
+            else :
+                external_upper[i, j] += coeff
+        elif a in external_idx :
+            coupling[external_idx[a], internal_idx[b]] += coeff
+        elif a == b :
+            internal_linear[internal_idx[a]] += coeff
+        else :
+            i, j = sorted((internal_idx[a], internal_idx[b]))
+            internal_quadratic[(i, j)] = internal_quadratic.get((i, j), 0) + coeff
+            internal_upper[i, j] += coeff
+
+    externals = assignment_bits(2**width, width).astype(np.float64)
+    energies = externals @ external_linear + ((externals @ external_upper) * externals).sum(axis=1)
+    fields = internal_linear + externals @ coupling
+
+    # With no negative couplings between internal variables, an internal variable with a non-negative
+    # field can never lower the energy by being set, so only the negative field ones need to be searched.
+    # This is what keeps the embedding indicators cheap, since at most a few of them are ever negative.
+    persistent = all(coeff >= 0 for coeff in internal_quadratic.values())
+
+    if persistent :
+        # Rows with at most one negative field are settled by that field alone
+        negative = fields < 0
+        simple = negative.sum(axis=1) <= 1
+        energies[simple] += np.where(negative[simple], fields[simple], 0).sum(axis=1)
+        rows = np.flatnonzero(~simple)
+    else :
+        rows = range(2**width)
+
+    for row in rows :
+        if persistent :
+            candidates = list(np.flatnonzero(negative[row]))
+        else :
+            candidates = list(range(internal_count))
+
+        if len(candidates) <= ENUMERATE_INTERNAL_LIMIT :
+            bits = assignment_bits(2**len(candidates), len(candidates)).astype(np.float64)
+            upper = internal_upper[np.ix_(candidates, candidates)]
+            sub_energies = bits @ fields[row, candidates] + ((bits @ upper) * bits).sum(axis=1)
+            energies[row] += sub_energies.min()
+        else :
+            candidate_set = set(candidates)
+            sub_linear = {i : fields[row, i] for i in candidates}
+            sub_quadratic = {key : coeff for key, coeff in internal_quadratic.items()
+                             if key[0] in candidate_set and key[1] in candidate_set}
+            energies[row] += min(0, BranchAndBoundSolver(sub_linear, sub_quadratic).solve().best_obj)
+    return energies
+
+def verify_embedding(module, embedding=None) :
+    """ Checks that the ground states of a BooleanSetModule embedding are exactly the module's set
+    elements. Returns whether membership is enforced correctly, the ground energy, the gap to the
+    lowest energy non-member, and any elements that are missing or spurious. """
+    if embedding is None :
+        embedding = module.embed()
+    energies = external_minimum_energies(embedding.linear, embedding.quadratic,
+                                         [f'bit_{i}' for i in range(module.width)])
+
+    result = SimpleNamespace()
+    result.best_obj = float(energies.min())
+    ground = isclose(energies, result.best_obj)
+    members = np.zeros(2**module.width, dtype=bool)
+    members[list(module.element_set)] = True
+
+    result.missing = sorted(int(x) for x in np.flatnonzero(members & ~ground))
+    result.spurious = sorted(int(x) for x in np.flatnonzero(ground & ~members))
+    result.correct = len(result.missing) == 0 and len(result.spurious) == 0
+    if members.all() :
+        result.second_best_obj = result.best_obj
+    else :
+        result.second_best_obj = float(energies[~members].min())
+    result.gap = result.second_best_obj - result.best_obj
+    result.energies = energies
+    return result
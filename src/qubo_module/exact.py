@@ -0,0 +1,40 @@
+"""
+Helpers for evaluating energies exactly. Models whose coefficients are integers, or rationals with
+small denominators, are scaled to integer coefficients so energies can be compared with plain
+equality rather than a relative tolerance.
+"""
+from fractions import Fraction
+import math
+
+MAX_DENOMINATOR = 1000
+MAX_SCALE = 2**20
+MAX_ENERGY = 2**62 # Keeps every int64 partial sum clear of overflow
+
+def integer_scale(coefficients, max_denominator=MAX_DENOMINATOR) :
+    """ Returns the smallest scale that makes every coefficient an integer, considering rationals with
+    denominators up to max_denominator. Returns None if there is no such scale. """
+    scale = 1
+    for coeff in coefficients :
+        fraction = Fraction(coeff).limit_denominator(max_denominator)
+        if not math.isclose(fraction, coeff, rel_tol=1e-12, abs_tol=1e-12) :
+            return None
+        scale = scale * fraction.denominator // math.gcd(scale, fraction.denominator)
+        if scale > MAX_SCALE :
+            return None
+    return scale
+
+def scale_coefficients(linear_coeffs, quadratic_coeffs, scale) :
+    """ Multiplies the (variable, coeff) and (v1, v2, coeff) lists by scale, returning them with
+    python int coefficients """
+    def scaled(coeff) :
+        value = round(coeff * scale)
+        if not math.isclose(value, coeff * scale, rel_tol=1e-9, abs_tol=1e-9) :
+            raise ValueError(f'Coefficient {coeff} is not a multiple of 1/{scale}')
+        return value
+
+    linear = [(var, scaled(coeff)) for var, coeff in linear_coeffs]
+    quadratic = [(v1, v2, scaled(coeff)) for v1, v2, coeff in quadratic_coeffs]
+    magnitude = sum(abs(coeff) for _, coeff in linear) + sum(abs(coeff) for _, _, coeff in quadratic)
+    if magnitude > MAX_ENERGY :
+        raise ValueError(f'Scaled energies can reach {magnitude}, which does not fit in int64')
+    return linear, quadratic
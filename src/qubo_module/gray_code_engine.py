@@ -0,0 +1,101 @@
+"""
+A single pass evaluation engine for the brute force solver. Assignments are visited in Gray code
+order, so every step flips exactly one variable and the energy is updated from that variable's
+row of coefficients instead of being recomputed from scratch.
+"""
+from types import SimpleNamespace
+import math
+
+REL_TOL = 1e-6
+
+# Incremental updates accumulate floating point error, so ties are also accepted within this many
+# ulps of the total coefficient magnitude. Models with integer coefficients are updated exactly.
+DRIFT_TOL = 64 * 2**-52
+
+class GrayCodeEngine :
+    """ Visits all 2**n assignments in one pass with O(degree) energy updates per step. """
+    MAX_VARIABLES = 20
+
+    def __init__(self, variable_count, linear_coeffs, quadratic_coeffs) :
+        self.variable_count = variable_count
+        self.linear_coeffs = linear_coeffs
+        self.quadratic_coeffs = quadratic_coeffs
+
+        self.linear = [0 for _ in range(variable_count)]
+        self.neighbours = [dict() for _ in range(variable_count)]
+        magnitude = 0
+        for var, coeff in linear_coeffs :
+            self.linear[var] += coeff
+            magnitude += abs(coeff)
+        for v1, v2, coeff in quadratic_coeffs :
+            magnitude += abs(coeff)
+            if v1 == v2 :
+                self.linear[v1] += coeff
+            else :
+                self.neighbours[v1][v2] = self.neighbours[v1].get(v2, 0) + coeff
+                self.neighbours[v2][v1] = self.neighbours[v2].get(v1, 0) + coeff
+        self.abs_tol = DRIFT_TOL * magnitude
+
+        # The lowest Gray code bit flips every other step, so it is assigned the lowest degree variable
+        self.flip_order = sorted(range(variable_count), key=lambda v: len(self.neighbours[v]))
+
+    def __isclose(self, a, b) :
+        return math.isclose(a, b, rel_tol=REL_TOL, abs_tol=self.abs_tol)
+
+    def evaluate(self, solution) :
+        """ Evaluates an assignment from scratch """
+        energy = 0
+        for var, coeff in self.linear_coeffs :
+            energy += solution[var] * coeff
+        for v1, v2, coeff in self.quadratic_coeffs :
+            energy += solution[v1]*solution[v2]*coeff
+        return energy
+
+    def solve(self) :
+        """ Returns the same result as BruteForceSolver.solve(), in a single pass """
+        solution = [0 for _ in range(self.variable_count)]
+        energy = 0
+
+        best = 0
+        optimal = [tuple(solution)]
+        second = None
+        second_solution = None
+        highest = 0
+        highest_solution = optimal[0]
+
+        for step in range(1, 2**self.variable_count) :
+            # The bit flipped by step k of the Gray code is the number of trailing zeros of k
+            var = self.flip_order[(step & -step).bit_length() - 1]
+            delta = self.linear[var]
+            for other, coeff in self.neighbours[var].items() :
+                if solution[other] :
+                    delta += coeff
+            if solution[var] :
+                solution[var] = 0
+                energy -= delta
+            else :
+                solution[var] = 1
+                energy += delta
+
+            if self.__isclose(energy, best) :
+                optimal.append(tuple(solution))
+            elif energy < best :
+                # The old optimum can't be tied with the new one, so it becomes the second best candidate
+                if second is None or best < second :
+                    second, second_solution = best, optimal[0]
+                best = energy
+                optimal = [tuple(solution)]
+            elif second is None or energy < second :
+                second, second_solution = energy, tuple(solution)
+
+            if energy > highest :
+                highest, highest_solution = energy, tuple(solution)
+
+        result = SimpleNamespace()
+        result.solutions = sorted(optimal)
+        result.best_obj = self.evaluate(result.solutions[0])
+        if second_solution is None :
+            second_solution = highest_solution
+        result.second_best_obj = self.evaluate(second_solution)
+        result.gap = result.second_best_obj - result.best_obj
+        return result
@@ -0,0 +1,25 @@
+"""
+Numbering of the variables of name-keyed (linear, quadratic) models, shared by the solvers so they
+all index, and so order their solutions, the same way.
+"""
+
+def index_model(linear, quadratic) :
+    """ Numbers the variables in the order they are first seen, linear keys first, then quadratic
+    keys in order. Returns (variable_count, var_idx_by_name, var_name_by_idx, linear_coeffs,
+    quadratic_coeffs), with the coefficients as (var, coeff) and (v1, v2, coeff) lists. """
+    var_idx_by_name = {}
+    var_name_by_idx = []
+    def process_var(var_name) :
+        if not var_name in var_idx_by_name :
+            var_idx_by_name[var_name] = len(var_name_by_idx)
+            var_name_by_idx.append(var_name)
+        return var_idx_by_name[var_name]
+
+    linear_coeffs = [(process_var(key), linear[key]) for key in linear]
+    quadratic_coeffs = []
+    for key in quadratic :
+        a, b = key
+        v1 = process_var(a)
+        v2 = process_var(b)
+        quadratic_coeffs.append((v1, v2, quadratic[key]))
+    return len(var_name_by_idx), var_idx_by_name, var_name_by_idx, linear_coeffs, quadratic_coeffs
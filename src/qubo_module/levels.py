@@ -0,0 +1,141 @@
+"""
+Bounded tracking of the lowest distinct energy levels of a model, for the top-k and gap proving
+modes of the brute force solver. Memory stays bounded by the number of levels kept and the number
+of solutions stored per level, however degenerate the model is.
+"""
+import heapq
+from types import SimpleNamespace
+import math
+
+import numpy as np
+
+from .vectorized_engine import REL_TOL, index_to_solution, isclose
+
+class LevelHeap :
+    """ Keeps the k lowest distinct energy levels seen so far. Energies within REL_TOL of each other
+    are one level, or only equal energies with exact=True. Each level keeps a count of its
+    assignments, and the indices of at most max_solutions of them, in the order they were added. """
+
+    def __init__(self, k, max_solutions=None, exact=False) :
+        if k < 1 :
+            raise ValueError(f'Invalid level count: {k}')
+        self.k = k
+        self.max_solutions = max_solutions
+        self.exact = exact
+        self.heap = [] # Max heap of the kept level energies, stored negated
+        self.levels = {} # Level energy -> [count, indices]
+
+    def threshold(self) :
+        """ Energies above this can't enter the kept levels (unless they tie with the top one) """
+        if len(self.heap) < self.k :
+            return math.inf
+        return -self.heap[0]
+
+    def add(self, start, energies) :
+        """ Adds a block of energies, for the assignments numbered from start """
+        threshold = self.threshold()
+        if threshold != math.inf and self.exact :
+            candidates = np.flatnonzero(energies <= threshold)
+        elif threshold != math.inf :
+            candidates = np.flatnonzero((energies <= threshold) | isclose(energies, threshold))
+        else :
+            candidates = np.arange(len(energies))
+        if len(candidates) == 0 :
+            return
+
+        values = energies[candidates]
+        for value in np.unique(values) :
+            value = value.item()
+            level = self.__find(value)
+            if level is None :
+                if len(self.heap) == self.k :
+                    if value > -self.heap[0] :
+                        continue
+                    del self.levels[-heapq.heappop(self.heap)]
+                heapq.heappush(self.heap, -value)
+                self.levels[value] = [0, []]
+                level = value
+
+            rows = candidates[values == value]
+            entry = self.levels[level]
+            entry[0] += len(rows)
+            if self.max_solutions is None or len(entry[1]) < self.max_solutions :
+                room = len(rows) if self.max_solutions is None else self.max_solutions - len(entry[1])
+                entry[1].extend(int(start + row) for row in rows[:room])
+
+    def __find(self, value) :
+        if self.exact :
+            return value if value in self.levels else None
+        for level in self.levels :
+            if math.isclose(value, level, rel_tol=REL_TOL) :
+                return level
+        return None
+
+    def sorted_levels(self, variable_count, scale=1) :
+        """ Returns the kept levels lowest first, with their solution tuples. Energies are divided by
+        scale, for engines evaluating integer scaled coefficients. """
+        result = []
+        for level in sorted(self.levels) :
+            count, indices = self.levels[level]
+            result.append(SimpleNamespace(energy=_unscale(level, scale), count=count,
+                                          solutions=[index_to_solution(i, variable_count) for i in sorted(indices)]))
+        return result
+
+def _unscale(energy, scale) :
+    return energy / scale if scale != 1 else energy
+
+def lower_bound(engine) :
+    """ A lower bound on the energy of every assignment. Each negative coupling is charged to one of its
+    variables, and each variable contributes min(0, linear + charged couplings). """
+    residual = engine.linear + np.minimum(engine.upper, 0).sum(axis=1)
+    return float(np.minimum(residual, 0).sum())
+
+def top_k_levels(engine, k, max_solutions_per_level=None, scale=1) :
+    """ Returns a result with the k lowest distinct energy levels of the engine's model. At least two
+    levels are tracked, so the second best energy and gap are right even for k=1. For an exact
+    engine on coefficients multiplied by scale, the levels are reported in the original units. """
+    if k < 1 :
+        raise ValueError(f'Invalid level count: {k}')
+    heap = LevelHeap(max(k, 2), max_solutions_per_level, engine.exact)
+    for start, energies in engine.blocks() :
+        heap.add(start, energies)
+
+    tracked = heap.sorted_levels(engine.variable_count, scale)
+    result = SimpleNamespace()
+    result.levels = tracked[:k]
+    result.best_obj = tracked[0].energy
+    result.solutions = tracked[0].solutions
+    result.second_best_obj = tracked[1].energy if len(tracked) > 1 else result.best_obj
+    result.gap = result.second_best_obj - result.best_obj
+    return result
+
+def prove_gap(engine, gap, scale=1) :
+    """ Decides whether the gap between the lowest two energy levels is at least `gap`. The claim is
+    disproven as soon as two levels are seen within `gap` of a lower bound on every energy, otherwise
+    it is settled once every assignment has been evaluated. For an exact engine on coefficients
+    multiplied by scale, the gap is compared in scaled units and energies are reported unscaled. """
+    bound = lower_bound(engine)
+    gap = gap * scale
+    heap = LevelHeap(2, max_solutions=0, exact=engine.exact)
+    result = SimpleNamespace()
+    result.evaluated = 0
+    result.settled_early = False
+    for start, energies in engine.blocks() :
+        heap.add(start, energies)
+        result.evaluated = start + len(energies)
+        if len(heap.heap) == 2 and heap.threshold() - bound < gap :
+            # The optimum is at least the bound, and the second best is at most the threshold
+            result.settled_early = result.evaluated < 2**engine.variable_count
+            break
+
+    levels = sorted(heap.levels)
+    best_obj = levels[0]
+    second_best_obj = levels[1] if len(levels) > 1 else levels[0]
+    if result.settled_early :
+        result.proven = False
+    else :
+        result.proven = second_best_obj - best_obj >= gap
+    result.best_obj = _unscale(best_obj, scale)
+    result.second_best_obj = _unscale(second_best_obj, scale)
+    result.lower_bound = _unscale(bound, scale)
+    return result
@@ -0,0 +1,70 @@
+"""
+A multi-process evaluation engine for the brute force solver. The assignment space is split into
+shards by fixing the top bits of the assignment as a prefix, and the shards are evaluated by the
+vectorized engine on a process pool.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+import os
+
+from .vectorized_engine import VectorizedEngine
+
+# Each worker process builds its own engine once, rather than having it pickled for every shard
+_worker_engine = None
+
+def _init_worker(variable_count, linear_coeffs, quadratic_coeffs, block_bits) :
+    global _worker_engine #pylint: disable=global-statement
+    _worker_engine = VectorizedEngine(variable_count, linear_coeffs, quadratic_coeffs, block_bits)
+
+def _shard_bounds(prefixes) :
+    return _worker_engine.energy_bounds(prefixes)
+
+def _shard_solutions(prefixes, best_obj) :
+    return _worker_engine.collect_solutions(prefixes, best_obj)
+
+class ParallelEngine :
+    """ Runs the two passes of the vectorized engine over shards of the assignment space on a
+    process pool. Shards are merged in prefix order, so the result matches the serial solver exactly. """
+    MAX_VARIABLES = VectorizedEngine.MAX_VARIABLES
+
+    def __init__(self, variable_count, linear_coeffs, quadratic_coeffs, workers=None, shard_bits=None, block_bits=None) :
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        if self.workers < 1 :
+            raise ValueError(f'Invalid worker count: {self.workers}')
+
+        self.engine = VectorizedEngine(variable_count, linear_coeffs, quadratic_coeffs, block_bits)
+        self.init_args = (variable_count, linear_coeffs, quadratic_coeffs, self.engine.block_bits)
+
+        # By default, aim for a few shards per worker so uneven shards still balance out
+        if shard_bits is None :
+            shard_bits = (4 * self.workers - 1).bit_length()
+        self.shard_bits = min(shard_bits, self.engine.prefix_bits)
+
+    def shards(self) :
+        """ Returns the block prefixes covered by each shard, in enumeration order """
+        blocks_per_shard = 2**(self.engine.prefix_bits - self.shard_bits)
+        return [range(shard * blocks_per_shard, (shard + 1) * blocks_per_shard)
+                for shard in range(2**self.shard_bits)]
+
+    def solve(self) :
+        """ Returns the same result as BruteForceSolver.solve(), evaluated on a process pool """
+        shards = self.shards()
+        if self.workers == 1 or len(shards) == 1 :
+            return self.engine.solve()
+
+        result = SimpleNamespace()
+        with ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=self.init_args) as pool :
+            # First pass to calculate the optimal objective
+            bounds = list(pool.map(_shard_bounds, shards))
+            result.best_obj = min(lowest for lowest, _ in bounds)
+            result.second_best_obj = max(highest for _, highest in bounds)
+
+            # Second pass to construct the optimal solution set, and the gap
+            result.solutions = []
+            for solutions, second_best_obj in pool.map(_shard_solutions, shards, [result.best_obj] * len(shards)) :
+                result.solutions.extend(solutions)
+                if second_best_obj is not None :
+                    result.second_best_obj = min(result.second_best_obj, second_best_obj)
+
+        result.gap = result.second_best_obj - result.best_obj
+        return result
@@ -0,0 +1,147 @@
+"""
+Preprocessing for the exact solvers. Variables whose optimal value follows from their coefficients
+alone are fixed, and the interaction graph of the rest is split into connected components that are
+solved independently, so a model made of independent pieces costs the sum of their sizes rather
+than the product.
+"""
+import itertools
+from types import SimpleNamespace
+
+class Preprocessor :
+    """ Fixes persistent variables and finds the connected components of a model given as
+    (variable, coeff) and (v1, v2, coeff) lists.
+
+    A variable is fixed to 0 when its linear term outweighs all of its negative couplings, and to 1
+    when its linear term outweighs all of its positive couplings, repeating as fixings update the
+    linear terms of their neighbours. An assignment whose first flipped fixed variable, in fixing
+    order, is v costs at least the margin of v more than the best, which bounds how many fixings
+    have to be undone to recover the second best energy. Variables in `forced` are set first. """
+
+    def __init__(self, variable_count, linear_coeffs, quadratic_coeffs, fix_variables=True, forced=None) :
+        self.variable_count = variable_count
+        self.linear_coeffs = linear_coeffs
+        self.quadratic_coeffs = quadratic_coeffs
+        self.linear = [0 for _ in range(variable_count)]
+        self.neighbours = [{} for _ in range(variable_count)]
+        for var, coeff in linear_coeffs :
+            self.linear[var] += coeff
+        for v1, v2, coeff in quadratic_coeffs :
+            if v1 == v2 :
+                self.linear[v1] += coeff
+            else :
+                self.neighbours[v1][v2] = self.neighbours[v1].get(v2, 0) + coeff
+                self.neighbours[v2][v1] = self.neighbours[v2].get(v1, 0) + coeff
+
+        self.fixed = {} # Variable -> value
+        self.margins = {} # Fixed variable -> the smallest energy increase from flipping it, in fixing order
+        self.offset = 0 # The energy contributed by the fixed variables
+        for var, value in (forced or {}).items() :
+            self.__fix(var, value)
+        if fix_variables :
+            self.__fix_persistent()
+        self.components = self.__find_components()
+
+    def __fix_persistent(self) :
+        pending = list(range(self.variable_count))
+        while pending :
+            var = pending.pop()
+            if var in self.fixed :
+                continue
+            couplings = self.neighbours[var].values()
+            lowest = self.linear[var] + sum(coeff for coeff in couplings if coeff < 0)
+            highest = self.linear[var] + sum(coeff for coeff in couplings if coeff > 0)
+            if lowest > 0 :
+                value, margin = 0, lowest
+            elif highest < 0 :
+                value, margin = 1, -highest
+            else :
+                continue
+            self.margins[var] = margin
+            pending.extend(self.__fix(var, value))
+
+    def __fix(self, var, value) :
+        """ Fixes var, folding it into the linear terms of its neighbours, which are returned """
+        self.fixed[var] = value
+        if value == 1 :
+            self.offset += self.linear[var]
+        neighbours = self.neighbours[var]
+        for other, coeff in neighbours.items() :
+            if value == 1 :
+                self.linear[other] += coeff
+            del self.neighbours[other][var]
+        self.neighbours[var] = {}
+        return list(neighbours)
+
+    def __find_components(self) :
+        components = []
+        seen = set(self.fixed)
+        for root in range(self.variable_count) :
+            if root in seen :
+                continue
+            seen.add(root)
+            component = [root]
+            for var in component :
+                for other in self.neighbours[var] :
+                    if other not in seen :
+                        seen.add(other)
+                        component.append(other)
+            components.append(sorted(component))
+        return components
+
+    def component_model(self, component) :
+        """ Returns the (linear, quadratic) dicts of a component, keyed by position in the component.
+        Every variable has a linear entry, in order, so solvers index them the same way. """
+        position = {var : i for i, var in enumerate(component)}
+        linear = {i : self.linear[var] for i, var in enumerate(component)}
+        quadratic = {}
+        for var in component :
+            for other, coeff in self.neighbours[var].items() :
+                if var < other :
+                    quadratic[(position[var], position[other])] = coeff
+        return linear, quadratic
+
+    def combine(self, results, solve_component) :
+        """ Combines a solve() result per component into a result for the whole model. When flipping
+        a fixed variable could cost less than the next level of the components, the best energy with
+        it flipped is found by preprocessing and solving again with solve_component(linear, quadratic). """
+        result = SimpleNamespace()
+        result.best_obj = self.offset + sum(component.best_obj for component in results)
+
+        # With every fixing kept, the next level up is reached by moving a single component to its own
+        # next level
+        gaps = [component.gap for component, variables in zip(results, self.components)
+                if len(component.solutions) < 2**len(variables)]
+        second_best_obj = result.best_obj + min(gaps) if gaps else None
+        for var, margin in sorted(self.margins.items(), key=lambda item: item[1]) :
+            if second_best_obj is not None and result.best_obj + margin >= second_best_obj :
+                break
+            flipped = Preprocessor(self.variable_count, self.linear_coeffs, self.quadratic_coeffs,
+                                   forced={var : 1 - self.fixed[var]})
+            obj = flipped.offset + sum(solve_component(*flipped.component_model(component)).best_obj
+                                       for component in flipped.components)
+            second_best_obj = obj if second_best_obj is None else min(second_best_obj, obj)
+        result.second_best_obj = result.best_obj if second_best_obj is None else second_best_obj
+        result.gap = result.second_best_obj - result.best_obj
+
+        result.solutions = []
+        for parts in itertools.product(*[component.solutions for component in results]) :
+            solution = [0 for _ in range(self.variable_count)]
+            for var, value in self.fixed.items() :
+                solution[var] = value
+            for variables, part in zip(self.components, parts) :
+                for var, value in zip(variables, part) :
+                    solution[var] = value
+            result.solutions.append(tuple(solution))
+        result.solutions.sort()
+        return result
+
+def solve_preprocessed(variable_count, linear_coeffs, quadratic_coeffs, solve_component) :
+    """ Solves a model by fixing persistent variables and solving each connected component with
+    solve_component(linear, quadratic). The result has the usual fields, plus `fixed` and
+    `component_sizes`. """
+    preprocessor = Preprocessor(variable_count, linear_coeffs, quadratic_coeffs)
+    result = preprocessor.combine([solve_component(*preprocessor.component_model(component))
+                                   for component in preprocessor.components], solve_component)
+    result.fixed = dict(preprocessor.fixed)
+    result.component_sizes = [len(component) for component in preprocessor.components]
+    return result
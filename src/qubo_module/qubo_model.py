@@ -0,0 +1,189 @@
+"""
+Array backed models and solution sets, with a single file binary format for passing them between
+pipeline stages. Variable names are interned into an index table, and coefficients and solutions are
+stored in typed arrays that are memory-mapped on load rather than copied.
+
+A file is an 8 byte magic, a little endian uint64 header length, a JSON header describing the
+arrays, and then the raw arrays, each aligned to ALIGNMENT bytes.
+"""
+import json
+import operator
+import struct
+
+import numpy as np
+
+from .indexing import index_model
+
+ALIGNMENT = 64
+MODEL_MAGIC = b'QUBOMDL1'
+SOLUTIONS_MAGIC = b'QUBOSOL1'
+
+def _encode_name(name) :
+    if isinstance(name, tuple) :
+        return [_encode_name(part) for part in name]
+    if isinstance(name, (str, int)) and not isinstance(name, bool) :
+        return name
+    raise ValueError(f'Cannot store variable name {name!r}, names must be strings, ints or tuples of them')
+
+def _decode_name(name) :
+    if isinstance(name, list) :
+        return tuple(_decode_name(part) for part in name)
+    return name
+
+def _write(path, magic, header, arrays) :
+    """ Writes the header and the arrays, recording where each array starts in the header """
+    header = dict(header, arrays={})
+    offset = 0
+    for key, array in arrays.items() :
+        header['arrays'][key] = { 'dtype' : array.dtype.str, 'shape' : list(array.shape), 'offset' : offset }
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+    encoded = json.dumps(header).encode('utf-8')
+    preamble = len(magic) + 8 + len(encoded)
+    padding = -preamble % ALIGNMENT
+    with open(path, 'wb') as file :
+        file.write(magic)
+        file.write(struct.pack('<Q', len(encoded) + padding))
+        file.write(encoded + b' ' * padding)
+        for key, array in arrays.items() :
+            file.write(np.ascontiguousarray(array).tobytes())
+            file.write(b'\0' * (-array.nbytes % ALIGNMENT))
+
+def _read(path, magic, mmap) :
+    """ Returns the header and its arrays, memory-mapped read only if mmap is set """
+    with open(path, 'rb') as file :
+        found = file.read(len(magic))
+        if found != magic :
+            raise ValueError(f'{path} is not a {magic.decode()} file')
+        header_length, = struct.unpack('<Q', file.read(8))
+        header = json.loads(file.read(header_length).decode('utf-8'))
+    data_start = len(magic) + 8 + header_length
+
+    arrays = {}
+    for key, info in header['arrays'].items() :
+        dtype = np.dtype(info['dtype'])
+        shape = tuple(info['shape'])
+        count = int(np.prod(shape))
+        if count == 0 :
+            arrays[key] = np.empty(shape, dtype=dtype)
+        elif mmap :
+            arrays[key] = np.memmap(path, dtype=dtype, mode='r', offset=data_start + info['offset'], shape=shape)
+        else :
+            arrays[key] = np.fromfile(path, dtype=dtype, count=count, offset=data_start + info['offset']).reshape(shape)
+    return header, arrays
+
+class QuboModel :
+    """ A QUBO with interned variable names. Variable i is names[i], linear terms are (linear_ids,
+    linear_coeffs), and quadratic terms are rows of the (count, 2) quadratic_ids with quadratic_coeffs. """
+
+    def __init__(self, names, linear_ids, linear_coeffs, quadratic_ids, quadratic_coeffs) :
+        self.names = list(names)
+        self.linear_ids = np.asarray(linear_ids, dtype=np.int32)
+        self.linear_coeffs = np.asarray(linear_coeffs, dtype=np.float64)
+        self.quadratic_ids = np.asarray(quadratic_ids, dtype=np.int32).reshape(-1, 2)
+        self.quadratic_coeffs = np.asarray(quadratic_coeffs, dtype=np.float64)
+        self.__index_by_name = None
+
+    @property
+    def variable_count(self) :
+        """ The number of interned variables """
+        return len(self.names)
+
+    @classmethod
+    def from_dicts(cls, linear, quadratic) :
+        """ Interns the names of name-keyed linear and quadratic dicts, in the order the solvers
+        index them: linear keys first, then quadratic keys in order. """
+        _, _, names, linear_coeffs, quadratic_coeffs = index_model(linear, quadratic)
+        return cls(names, [var for var, _ in linear_coeffs], list(linear.values()),
+                   [(v1, v2) for v1, v2, _ in quadratic_coeffs], list(quadratic.values()))
+
+    @classmethod
+    def from_compact(cls, compact) :
+        """ Wraps the result of BooleanSetModule.embed_compact(), without copying its arrays """
+        names = [compact.variable_name(var) for var in range(compact.variable_count)]
+        return cls(names, compact.linear_ids, compact.linear_coeffs, compact.quadratic_ids, compact.quadratic_coeffs)
+
+    def index(self, name) :
+        """ The index of a variable name """
+        if self.__index_by_name is None :
+            self.__index_by_name = { name : i for i, name in enumerate(self.names) }
+        return self.__index_by_name[name]
+
+    def to_dicts(self) :
+        """ Converts back to name-keyed linear and quadratic dicts """
+        names = self.names
+        linear = { names[var] : coeff for var, coeff in zip(self.linear_ids.tolist(), self.linear_coeffs.tolist()) }
+        quadratic = { (names[a], names[b]) : coeff
+                      for (a, b), coeff in zip(self.quadratic_ids.tolist(), self.quadratic_coeffs.tolist()) }
+        return linear, quadratic
+
+    def save(self, path) :
+        """ Writes the model to a single file """
+        _write(path, MODEL_MAGIC, { 'names' : [_encode_name(name) for name in self.names] }, {
+            'linear_ids' : self.linear_ids,
+            'linear_coeffs' : self.linear_coeffs,
+            'quadratic_ids' : self.quadratic_ids,
+            'quadratic_coeffs' : self.quadratic_coeffs,
+        })
+
+    @classmethod
+    def load(cls, path, mmap=True) :
+        """ Reads a model written by save(). With mmap the arrays are read only views of the file. """
+        header, arrays = _read(path, MODEL_MAGIC, mmap)
+        model = cls.__new__(cls)
+        model.names = [_decode_name(name) for name in header['names']]
+        model.linear_ids = arrays['linear_ids']
+        model.linear_coeffs = arrays['linear_coeffs']
+        model.quadratic_ids = arrays['quadratic_ids']
+        model.quadratic_coeffs = arrays['quadratic_coeffs']
+        model.__index_by_name = None
+        return model
+
+class PackedSolutions :
+    """ A set of solutions stored 8 variables to a byte, one row per solution. Indexing and iterating
+    give the same tuples that the solvers return. """
+
+    def __init__(self, bits, variable_count, names=None) :
+        self.bits = bits
+        self.variable_count = variable_count
+        self.names = None if names is None else list(names)
+
+    @classmethod
+    def from_array(cls, assignments, names=None) :
+        """ Packs a (solutions, variables) array of 0/1 values, e.g. the assignments of a chunk """
+        assignments = np.asarray(assignments, dtype=np.uint8)
+        return cls(np.packbits(assignments, axis=1), assignments.shape[1], names)
+
+    @classmethod
+    def from_solutions(cls, solutions, variable_count, names=None) :
+        """ Packs a list of solution tuples """
+        return cls.from_array(np.array(solutions, dtype=np.uint8).reshape(-1, variable_count), names)
+
+    def __len__(self) :
+        return len(self.bits)
+
+    def __getitem__(self, index) :
+        """ The solution tuple at an integer index, or a list of them for a slice, as with a list """
+        if isinstance(index, slice) :
+            return list(map(tuple, np.unpackbits(self.bits[index], axis=1, count=self.variable_count).tolist()))
+        return tuple(np.unpackbits(self.bits[operator.index(index)], count=self.variable_count).tolist())
+
+    def __iter__(self) :
+        for start in range(0, len(self.bits), 2**16) :
+            yield from map(tuple, self.to_array(start, start + 2**16).tolist())
+
+    def to_array(self, start=0, stop=None) :
+        """ Unpacks the solutions from start to stop into a (solutions, variables) uint8 array """
+        return np.unpackbits(self.bits[start:stop], axis=1, count=self.variable_count)
+
+    def save(self, path) :
+        """ Writes the solutions to a single file """
+        names = None if self.names is None else [_encode_name(name) for name in self.names]
+        _write(path, SOLUTIONS_MAGIC, { 'variable_count' : self.variable_count, 'names' : names }, { 'bits' : self.bits })
+
+    @classmethod
+    def load(cls, path, mmap=True) :
+        """ Reads solutions written by save(). With mmap the packed bits are a read only view of the file. """
+        header, arrays = _read(path, SOLUTIONS_MAGIC, mmap)
+        names = None if header['names'] is None else [_decode_name(name) for name in header['names']]
+        return cls(arrays['bits'], header['variable_count'], names)
@@ -0,0 +1,79 @@
+"""
+A registry of the available QUBO solvers and what they can do, so callers can ask for a solver by
+name, or have the fastest one that can handle a model picked for them. Solvers are registered as
+'module:attribute' paths and only imported when first used, so backends with heavy or optional
+dependencies cost nothing until they are picked.
+"""
+import importlib
+from types import SimpleNamespace
+
+SOLVERS = {}
+
+def register_solver(name, target, exact, max_variables=None, min_variables=0, rank=100, auto=True, options=None) :
+    """ Registers a solver class, given as a 'module:attribute' path. It must take (linear, quadratic,
+    **options) and have a solve() that returns the usual result fields.
+
+    exact says whether its results are proven optimal. It is considered for models with between
+    min_variables and max_variables variables (None for no limit), lower ranks being preferred.
+    auto=False keeps it out of automatic selection, for solvers that only suit some models.
+    options are keyword arguments always passed to the solver, e.g. the brute force engine. """
+    if name in SOLVERS :
+        raise ValueError(f"Solver '{name}' is already registered")
+    SOLVERS[name] = SimpleNamespace(name=name, target=target, exact=exact, max_variables=max_variables,
+                                    min_variables=min_variables, rank=rank, auto=auto, options=dict(options or {}))
+
+def solver_class(name) :
+    """ Imports and returns the class of a registered solver """
+    if name not in SOLVERS :
+        raise ValueError(f"Unknown solver '{name}'")
+    module_name, attribute = SOLVERS[name].target.split(':')
+    return getattr(importlib.import_module(module_name), attribute)
+
+def choose_solver(variable_count, exact=True) :
+    """ Returns the name of the preferred automatically selectable solver for a model of the given size """
+    candidates = [entry for entry in SOLVERS.values()
+                  if entry.auto and (entry.exact or not exact) and variable_count >= entry.min_variables
+                  and (entry.max_variables is None or variable_count <= entry.max_variables)]
+    if not candidates :
+        raise ValueError(f'No registered solver can solve {variable_count} variables'
+            + (' exactly' if exact else ''))
+    return min(candidates, key=lambda entry: entry.rank).name
+
+def _variable_count(linear, quadratic) :
+    names = set(linear)
+    for a, b in quadratic :
+        names.update((a, b))
+    return len(names)
+
+def create_solver(linear, quadratic, solver=None, exact=True, **options) :
+    """ Constructs the named solver on the model, or the preferred one for its size if solver is None """
+    if solver is None :
+        solver = choose_solver(_variable_count(linear, quadratic), exact)
+    return solver_class(solver)(linear, quadratic, **dict(SOLVERS[solver].options, **options))
+
+def solve(linear, quadratic, solver=None, exact=True, **options) :
+    """ Solves the model with the named solver, or the preferred one for its size. The result records
+    the name of the solver used in `solver`. """
+    if solver is None :
+        solver = choose_solver(_variable_count(linear, quadratic), exact)
+    result = create_solver(linear, quadratic, solver, exact, **options).solve()
+    result.solver = solver
+    return result
+
+register_solver('parallel', 'qubo_module.brute_force_solver:BruteForceSolver', exact=True, min_variables=24,
+                max_variables=30, rank=0, options={ 'engine' : 'parallel' })
+register_solver('vectorized', 'qubo_module.brute_force_solver:BruteForceSolver', exact=True, max_variables=30,
+                rank=1, options={ 'engine' : 'vectorized' })
+register_solver('gray_code', 'qubo_module.brute_force_solver:BruteForceSolver', exact=True, max_variables=20,
+                rank=2, options={ 'engine' : 'gray_code' })
+register_solver('brute_force', 'qubo_module.brute_force_solver:BruteForceSolver', exact=True, max_variables=16, rank=3)
+register_solver('simulated_annealing', 'qubo_module.simulated_annealing_solver:SimulatedAnnealingSolver', exact=False, rank=4)
+# Sparse models of this size take seconds, the search time grows quickly beyond it
+register_solver('branch_and_bound', 'qubo_module.branch_and_bound_solver:BranchAndBoundSolver', exact=True,
+                max_variables=60, rank=5)
+# Needs integer coefficients, and only beats the vectorized engine on sparse models
+register_solver('bit_sliced', 'qubo_module.brute_force_solver:BruteForceSolver', exact=True, max_variables=30,
+                rank=2, auto=False, options={ 'engine' : 'bit_sliced' })
+# Only fast when the interaction graph has low treewidth, which the size of a model doesn't tell
+register_solver('variable_elimination', 'qubo_module.variable_elimination_solver:VariableEliminationSolver',
+                exact=True, rank=6, auto=False)
@@ -0,0 +1,94 @@
+"""
+Contains a heuristic simulated annealing QUBO solver, for models that are too large for the exact
+solvers. Many replicas are annealed at once on array backed coefficients.
+"""
+from types import SimpleNamespace
+import math
+
+import numpy as np
+
+from .indexing import index_model
+from .vectorized_engine import dense_model, isclose
+
+class SimulatedAnnealingSolver :
+    """ Approximately solve a QUBO problem instance by simulated annealing. Takes the same model and
+    returns the same result fields as BruteForceSolver, but the solutions are only the best ones found. """
+
+    def __init__(self, linear, quadratic, replicas=64, sweeps=1000, beta_range=None, schedule='geometric', seed=None):
+        if replicas < 1 :
+            raise ValueError(f'Invalid replica count: {replicas}')
+        if sweeps < 1 :
+            raise ValueError(f'Invalid sweep count: {sweeps}')
+        if schedule not in ('geometric', 'linear') :
+            raise ValueError(f"Unknown schedule '{schedule}'")
+
+        self.model = { 'linear' : linear, 'quadratic' : quadratic }
+        (self.variable_count, self.var_idx_by_name, self.var_name_by_idx,
+            self.linear_coeffs, self.quadratic_coeffs) = index_model(linear, quadratic)
+
+        self.replicas = replicas
+        self.sweeps = sweeps
+        self.schedule = schedule
+        self.seed = seed
+
+        self.linear, upper = dense_model(self.variable_count, self.linear_coeffs, self.quadratic_coeffs)
+        self.couplings = upper + upper.T # Symmetric, so couplings[v] is the field row of v
+
+        self.beta_range = beta_range if beta_range is not None else self.__default_beta_range()
+
+    def __default_beta_range(self) :
+        """ Starts hot enough that the largest single flip is accepted half the time, and ends cold
+        enough that the smallest one is only accepted 1% of the time. """
+        largest = np.abs(self.linear) + np.abs(self.couplings).sum(axis=1)
+        coefficients = np.abs(np.concatenate([self.linear, self.couplings.ravel()]))
+        coefficients = coefficients[coefficients > 0]
+        if len(coefficients) == 0 :
+            return (1.0, 1.0)
+        return (math.log(2) / largest.max(), math.log(100) / coefficients.min())
+
+    def betas(self) :
+        """ The inverse temperature for each sweep """
+        beta_min, beta_max = self.beta_range
+        if self.schedule == 'geometric' :
+            return np.geomspace(beta_min, beta_max, self.sweeps)
+        return np.linspace(beta_min, beta_max, self.sweeps)
+
+    def energies(self, states) :
+        """ Evaluates the energy of each row of a (replicas, variables) array of states """
+        return states @ self.linear + 0.5 * ((states @ self.couplings) * states).sum(axis=1)
+
+    def anneal(self) :
+        """ Returns the final (replicas, variables) array of states """
+        rng = np.random.default_rng(self.seed)
+        states = rng.integers(0, 2, size=(self.replicas, self.variable_count)).astype(np.float64)
+        fields = self.linear + states @ self.couplings # Energy change from setting each variable to 1
+
+        for beta in self.betas() :
+            for var in range(self.variable_count) :
+                delta = (1 - 2*states[:, var]) * fields[:, var]
+                flip = (delta <= 0) | (rng.random(self.replicas) < np.exp(-beta * np.maximum(delta, 0)))
+                if flip.any() :
+                    change = np.where(flip, 1 - 2*states[:, var], 0)
+                    states[:, var] += change
+                    fields += change[:, None] * self.couplings[var]
+        return states
+
+    def solve(self) :
+        """ Returns the best solutions found, the best energy found, the gap to the next best energy
+        found, and `samples` - a list of (solution, energy, occurrences) for each distinct final state,
+        lowest energy first. """
+        states, counts = np.unique(self.anneal().astype(np.int8), axis=0, return_counts=True)
+        energies = self.energies(states.astype(np.float64))
+        order = np.argsort(energies, kind='stable')
+
+        result = SimpleNamespace()
+        result.samples = [(tuple(int(bit) for bit in states[i]), float(energies[i]), int(counts[i])) for i in order]
+        result.best_obj = result.samples[0][1]
+        optimal = isclose(energies, result.best_obj)
+        result.solutions = sorted(tuple(int(bit) for bit in states[i]) for i in np.flatnonzero(optimal))
+        if optimal.all() :
+            result.second_best_obj = result.best_obj
+        else :
+            result.second_best_obj = float(energies[~optimal].min())
+        result.gap = result.second_best_obj - result.best_obj
+        return result
@@ -3,7 +3,7 @@ This module is for tiles, which can be created to represent features of a given
 In the future, the intention is to split a QPU into "tiles" that allow for us to optimize the
 embedding of unary functions in modular fields.
 """
-import itertools
+import numpy as np
 
 class FullyConnectedTile :
     """ Represents a fully connected tile. All qubits are connected to eachother"""
@@ -39,15 +39,119 @@ class FullyConnectedTile :
             self.internal.append(self.__new_var())
 
         # Since this is a fully connected tile, we are going to add a coefficient for every variable pair
-        self.coefficients = []
-        for a, b in itertools.product(range(self.var_count), repeat=2) :
-            if a < b :
-                self.coefficients.append( (a,b) )
+        self.edge_i, self.edge_j = np.triu_indices(self.var_count, 1)
+        self.coefficients = list(zip(self.edge_i.tolist(), self.edge_j.tolist()))
 
     def __new_var(self) :
         result =  self.var_count
         self.var_count += 1
         return result
 
-    
-    
\ No newline at end of file
+class SparseTile :
+    """ Base class for tiles with sparse connectivity. Couplers are stored as edge arrays (edge_i < edge_j)
+    and in CSR form, so neighbors(v) is a slice rather than a search. Subclasses call __init__ with the
+    variable count and the boundary views, then add their edges with _set_edges. """
+    def __init__(self, var_count, left, right, top, bottom, internal) :
+        self.var_count = var_count
+        self.left = left
+        self.right = right
+        self.top = top
+        self.bottom = bottom
+        self.internal = internal
+        self.edge_i = np.zeros(0, dtype=np.int32)
+        self.edge_j = np.zeros(0, dtype=np.int32)
+        self.indptr = np.zeros(var_count + 1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int32)
+
+    def _set_edges(self, edge_i, edge_j) :
+        a = np.minimum(edge_i, edge_j).astype(np.int32)
+        b = np.maximum(edge_i, edge_j).astype(np.int32)
+        order = np.lexsort((b, a))
+        self.edge_i = a[order]
+        self.edge_j = b[order]
+
+        # Each edge appears in the adjacency of both of its ends
+        sources = np.concatenate([self.edge_i, self.edge_j])
+        targets = np.concatenate([self.edge_j, self.edge_i])
+        order = np.lexsort((targets, sources))
+        self.indices = targets[order]
+        self.indptr = np.zeros(self.var_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=self.var_count), out=self.indptr[1:])
+
+    @property
+    def coefficients(self) :
+        """ The couplers as a list of (i, j) tuples, like FullyConnectedTile.coefficients """
+        return list(zip(self.edge_i.tolist(), self.edge_j.tolist()))
+
+    @property
+    def edge_count(self) :
+        """ The number of couplers in the tile """
+        return len(self.edge_i)
+
+    def neighbors(self, var) :
+        """ Returns the variables coupled to var, in increasing order """
+        return self.indices[self.indptr[var]:self.indptr[var + 1]]
+
+    def degree(self, var) :
+        """ Returns the number of variables coupled to var """
+        return int(self.indptr[var + 1] - self.indptr[var])
+
+def _validate_dimensions(**dimensions) :
+    for name, value in dimensions.items() :
+        if value < 1 :
+            raise ValueError(f"Invalid {name}: {value}")
+
+class GridOfCliquesTile(SparseTile) :
+    """ A rows x cols grid of cells, where each cell is a fully connected clique of clique_size qubits.
+    Qubit k of a cell is coupled to qubit k of the cells to its right and below it.
+
+    Qubit k of cell (r, c) is variable (r*cols + c)*clique_size + k. The boundary views hold every qubit
+    of the cells on that side of the grid, so corner cells appear in two views. """
+    def __init__(self, rows: int, cols: int, clique_size: int) :
+        _validate_dimensions(rows=rows, cols=cols, clique_size=clique_size)
+        self.rows = rows
+        self.cols = cols
+        self.clique_size = clique_size
+
+        qubits = np.arange(rows * cols * clique_size, dtype=np.int32).reshape(rows, cols, clique_size)
+        boundary = np.zeros((rows, cols), dtype=bool)
+        boundary[[0, -1], :] = True
+        boundary[:, [0, -1]] = True
+        super().__init__(qubits.size, qubits[:, 0].ravel(), qubits[:, -1].ravel(),
+                         qubits[0].ravel(), qubits[-1].ravel(), qubits[~boundary].ravel())
+
+        a, b = np.triu_indices(clique_size, 1)
+        self._set_edges(
+            np.concatenate([qubits[:, :, a].ravel(), qubits[:, :-1].ravel(), qubits[:-1].ravel()]),
+            np.concatenate([qubits[:, :, b].ravel(), qubits[:, 1:].ravel(), qubits[1:].ravel()]))
+
+class BipartiteCellTile(SparseTile) :
+    """ A rows x cols lattice of bipartite cells, each a complete bipartite graph between shore_size
+    vertical and shore_size horizontal qubits (the Chimera topology). Vertical qubits are coupled to the
+    same qubit in the cells above and below, horizontal qubits to the cells left and right.
+
+    Qubit k of shore s (0 vertical, 1 horizontal) in cell (r, c) is variable
+    ((r*cols + c)*2 + s)*shore_size + k. The left and right views are the horizontal qubits of the outer
+    columns, top and bottom are the vertical qubits of the outer rows, and internal is everything else. """
+    def __init__(self, rows: int, cols: int, shore_size: int) :
+        _validate_dimensions(rows=rows, cols=cols, shore_size=shore_size)
+        self.rows = rows
+        self.cols = cols
+        self.shore_size = shore_size
+
+        qubits = np.arange(rows * cols * 2 * shore_size, dtype=np.int32).reshape(rows, cols, 2, shore_size)
+        vertical = qubits[:, :, 0]
+        horizontal = qubits[:, :, 1]
+        in_view = np.zeros(qubits.shape, dtype=bool)
+        in_view[:, [0, -1], 1] = True
+        in_view[[0, -1], :, 0] = True
+        super().__init__(qubits.size, horizontal[:, 0].ravel(), horizontal[:, -1].ravel(),
+                         vertical[0].ravel(), vertical[-1].ravel(), qubits[~in_view].ravel())
+
+        # Every vertical qubit of a cell is coupled to every horizontal qubit of the same cell
+        shape = (rows, cols, shore_size, shore_size)
+        self._set_edges(
+            np.concatenate([np.broadcast_to(vertical[:, :, :, None], shape).ravel(),
+                            vertical[:-1].ravel(), horizontal[:, :-1].ravel()]),
+            np.concatenate([np.broadcast_to(horizontal[:, :, None, :], shape).ravel(),
+                            vertical[1:].ravel(), horizontal[:, 1:].ravel()]))
@@ -0,0 +1,132 @@
+"""
+Finds coefficients for a boolean set on a tile by linear programming. Each assignment of the set's
+bits gives one constraint over the tile's terms that are active in that assignment: set elements
+must have zero energy, and everything else must be at least the gap above it.
+
+ortools is only imported when the first LP is built, so importing this module (and the boolean set
+module with it) stays cheap for processes that never embed onto a tile.
+"""
+from types import SimpleNamespace
+
+import numpy as np
+
+from .tile import FullyConnectedTile
+from .vectorized_engine import assignment_bits
+
+LP_VAR_LOWER=-100
+LP_VAR_UPPER=100
+
+_pywraplp = None
+
+def _load_ortools() :
+    """ Imports ortools and sets up its logging, once per process, returning pywraplp """
+    global _pywraplp #pylint: disable=global-statement
+    if _pywraplp is None :
+        try :
+            #pylint: disable=import-outside-toplevel
+            from ortools.linear_solver import pywraplp
+            from ortools.init import pywrapinit
+        except ImportError as error :
+            raise ImportError('Embedding onto a tile needs ortools, install it with the qubo-module[mip] extra') from error
+
+        pywrapinit.CppBridge.InitLogging('qubo_module')
+        cpp_flags = pywrapinit.CppFlags()
+        cpp_flags.logtostderr = True
+        cpp_flags.log_prefix = False
+        pywrapinit.CppBridge.SetFlags(cpp_flags)
+        _pywraplp = pywraplp
+    return _pywraplp
+
+class TileMipEmbedder :
+    """ Holds the tile dependent part of the LP, so many boolean sets can be embedded onto the same
+    tile. Bit i of a set is placed on tile variable i.
+
+    The LP for sets of a given width is built once, since its constraint matrix only depends on the
+    width. Embedding a set only sets the bounds and gap coefficient of each constraint, and re-solves. """
+
+    def __init__(self, tile : FullyConnectedTile) :
+        self.tile = tile
+        # Every tile term, linear terms first as (i, i)
+        variables = np.arange(tile.var_count, dtype=np.int64)
+        self.term_i = np.concatenate([variables, tile.edge_i.astype(np.int64)])
+        self.term_j = np.concatenate([variables, tile.edge_j.astype(np.int64)])
+        self.patterns = {}
+        self.lps = {}
+
+    def active_terms(self, width) :
+        """ Returns (terms, pattern) for sets of the given width. terms are the indexes of the tile terms
+        that only touch the first width variables, and pattern[s, t] is 1 if terms[t] is active in
+        assignment s. Terms outside of the set's bits are never active, so they are left at zero. """
+        if width not in self.patterns :
+            terms = np.flatnonzero((self.term_i < width) & (self.term_j < width))
+            bits = assignment_bits(2**width, width)
+            pattern = bits[:, self.term_i[terms]] & bits[:, self.term_j[terms]]
+            self.patterns[width] = (terms, pattern)
+        return self.patterns[width]
+
+    def lp(self, width) :
+        """ Returns the LP for sets of the given width, with one constraint per assignment of the set's
+        bits over the terms active in it. Its bounds and gap coefficients are set per set by embed(). """
+        if width not in self.lps :
+            pywraplp = _load_ortools()
+            solver = pywraplp.Solver.CreateSolver('CLP')
+            if not solver:
+                raise RuntimeError('BooleanSetModule was unable to instantiate an instance of CLP solver through ortools.')
+
+            terms, pattern = self.active_terms(width)
+            lp = SimpleNamespace(solver=solver, terms=terms)
+            lp.term_vars = [solver.NumVar(LP_VAR_LOWER, LP_VAR_UPPER, f'term_{t}') for t in terms]
+            lp.gap_var = solver.NumVar(0, LP_VAR_UPPER, 'gap')
+            objective = solver.Objective()
+            objective.SetCoefficient(lp.gap_var, 100) # Maximize the gap!
+            objective.SetMaximization()
+
+            lp.constraints = [solver.Constraint(0, 0, f'constraint_{solution_int}') for solution_int in range(2**width)]
+            for t, var in enumerate(lp.term_vars) :
+                for solution_int in np.flatnonzero(pattern[:, t]) :
+                    lp.constraints[solution_int].SetCoefficient(var, 1)
+            lp.members = np.ones(2**width, dtype=bool) # What the bounds are currently set up for
+            self.lps[width] = lp
+        return self.lps[width]
+
+    def embed(self, module) :
+        """ Returns the gap and the tile coefficients that maximize it for the module's set """
+        if module.width > self.tile.var_count :
+            raise ValueError(f'BooleanSetModule of width {module.width} does not fit on a tile with '
+                + f'{self.tile.var_count} variables')
+
+        pywraplp = _load_ortools()
+        lp = self.lp(module.width)
+        solver = lp.solver
+
+        # Set elements must have zero energy, everything else at least the gap
+        infinity = solver.infinity()
+        members = np.zeros(2**module.width, dtype=bool)
+        members[list(module.element_set)] = True
+        for solution_int in np.flatnonzero(members != lp.members) :
+            constraint = lp.constraints[solution_int]
+            if members[solution_int] :
+                constraint.SetBounds(0, 0)
+                constraint.SetCoefficient(lp.gap_var, 0)
+            else :
+                constraint.SetBounds(0, infinity)
+                constraint.SetCoefficient(lp.gap_var, -1)
+        lp.members = members
+
+        result = SimpleNamespace()
+        result.status = solver.Solve()
+        result.optimal = result.status == pywraplp.Solver.OPTIMAL
+        result.gap = lp.gap_var.solution_value()
+        result.linear = {}
+        result.quadratic = {}
+        for t, var in zip(lp.terms, lp.term_vars) :
+            i, j = int(self.term_i[t]), int(self.term_j[t])
+            if i == j :
+                result.linear[i] = var.solution_value()
+            else :
+                result.quadratic[(i, j)] = var.solution_value()
+        return result
+
+    def embed_many(self, modules) :
+        """ Embeds each of the modules onto the tile, returning the results in the same order """
+        return [self.embed(module) for module in modules]
@@ -0,0 +1,184 @@
+"""
+Contains an exact QUBO solver based on variable elimination, i.e. dynamic programming over the tree
+decomposition that an elimination order induces. Its cost is exponential only in the width of the
+decomposition, so long chains of small modules that share a few bits can be solved whole.
+"""
+import heapq
+from types import SimpleNamespace
+import math
+
+import numpy as np
+
+from .indexing import index_model
+from .vectorized_engine import isclose
+
+class VariableEliminationSolver :
+    """ Solve a QUBO problem instance exactly by variable elimination. Takes the same model and
+    returns the same result as BruteForceSolver, plus the `width` of the decomposition used.
+
+    Every table holds the lowest two distinct energy levels for each assignment of its scope, so the
+    gap comes out of the same pass as the optimum. The optimal solutions are then enumerated by
+    tracing the eliminations back, keeping every value that is tied for the optimum.
+
+    The elimination order defaults to greedy minimum degree, or can be given as a list of names. """
+    MAX_WIDTH = 20
+
+    def __init__(self, linear, quadratic, order=None, max_width=None):
+        self.model = { 'linear' : linear, 'quadratic' : quadratic }
+        (self.variable_count, self.var_idx_by_name, self.var_name_by_idx,
+            self.linear_coeffs, self.quadratic_coeffs) = index_model(linear, quadratic)
+
+        self.max_width = max_width if max_width is not None else VariableEliminationSolver.MAX_WIDTH
+        self.neighbours = [set() for _ in range(self.variable_count)]
+        for v1, v2, _ in self.quadratic_coeffs :
+            if v1 != v2 :
+                self.neighbours[v1].add(v2)
+                self.neighbours[v2].add(v1)
+
+        if order is None :
+            self.order = self.__min_degree_order()
+        else :
+            if sorted(order, key=str) != sorted(self.var_name_by_idx, key=str) or len(set(order)) != len(order) :
+                raise ValueError('The elimination order must list every variable exactly once')
+            self.order = [self.var_idx_by_name[name] for name in order]
+        self.width = self.__width()
+        if self.width > self.max_width :
+            raise ValueError(f'Decomposition too wide! Width is {self.width}, max is {self.max_width}.')
+
+    def __min_degree_order(self) :
+        """ Greedily eliminates the variable with the fewest remaining neighbours, connecting up its
+        neighbours as elimination would """
+        graph = [set(neighbours) for neighbours in self.neighbours]
+        heap = [(len(graph[var]), var) for var in range(self.variable_count)]
+        heapq.heapify(heap)
+        eliminated = set()
+        order = []
+        while heap :
+            degree, var = heapq.heappop(heap)
+            if var in eliminated or degree != len(graph[var]) :
+                continue # Stale entry
+            eliminated.add(var)
+            order.append(var)
+            for other in graph[var] :
+                graph[other].discard(var)
+                graph[other].update(graph[var] - {other})
+                heapq.heappush(heap, (len(graph[other]), other))
+        return order
+
+    def __width(self) :
+        """ The largest number of other variables any variable is eliminated alongside """
+        graph = [set(neighbours) for neighbours in self.neighbours]
+        width = 0
+        for var in self.order :
+            width = max(width, len(graph[var]))
+            for other in graph[var] :
+                graph[other].discard(var)
+                graph[other].update(graph[var] - {other})
+        return width
+
+    def __initial_tables(self) :
+        """ One (scope, lowest, second lowest) table per term. Scopes are sorted variable tuples, with
+        one axis of length 2 per variable. Single terms have no second level, so it is infinite. """
+        tables = []
+        for var, coeff in self.linear_coeffs :
+            tables.append(((var,), np.array([0.0, coeff]), np.full(2, math.inf)))
+        for v1, v2, coeff in self.quadratic_coeffs :
+            if v1 == v2 :
+                tables.append(((v1,), np.array([0.0, coeff]), np.full(2, math.inf)))
+            else :
+                lowest = np.zeros((2, 2))
+                lowest[1, 1] = coeff
+                tables.append((tuple(sorted((v1, v2))), lowest, np.full((2, 2), math.inf)))
+        return tables
+
+    @staticmethod
+    def __expand(scope, table, union) :
+        """ Reshapes a table over scope so it broadcasts over the (sorted) union of scopes """
+        return table.reshape([2 if var in scope else 1 for var in union])
+
+    @staticmethod
+    def __lowest_two(candidates) :
+        """ The lowest, and lowest distinct second, of a stack of candidate level arrays """
+        lowest = candidates.min(axis=0)
+        distinct = np.where(isclose(candidates, lowest), math.inf, candidates)
+        return lowest, distinct.min(axis=0)
+
+    def __combine(self, tables) :
+        """ Sums tables into one over the union of their scopes """
+        union = tuple(sorted(set().union(*[scope for scope, _, _ in tables])))
+        lowest = np.zeros([2] * len(union))
+        second = np.full([2] * len(union), math.inf)
+        for scope, table_lowest, table_second in tables :
+            table_lowest = self.__expand(scope, table_lowest, union)
+            table_second = self.__expand(scope, table_second, union)
+            candidates = np.stack(np.broadcast_arrays(lowest + table_second, second + table_lowest))
+            second = candidates.min(axis=0)
+            lowest = lowest + table_lowest
+            # Sums of two levels can collapse onto the lowest one within tolerance
+            second = np.where(isclose(second, lowest), math.inf, second)
+        return union, lowest, second
+
+    def solve(self, max_solutions=None) :
+        """ Returns the set of optimal solutions to the QUBO (at most max_solutions of them, if given),
+        the optimal energy, as well as the gap between optimal and non-optimal solutions. """
+        position = { var : i for i, var in enumerate(self.order) }
+        pending = [[] for _ in self.order] # Each table waits in the bucket of its first eliminated variable
+        finished = [] # Tables with an empty scope
+        def place(table) :
+            if table[0] :
+                pending[min(position[var] for var in table[0])].append(table)
+            else :
+                finished.append(table)
+
+        for table in self.__initial_tables() :
+            place(table)
+        buckets = [] # (scope, lowest) of each bucket, for the trace back
+        for i, var in enumerate(self.order) :
+            if pending[i] :
+                scope, lowest, second = self.__combine(pending[i])
+            else :
+                scope, lowest, second = (var,), np.zeros(2), np.full(2, math.inf)
+            pending[i] = None
+            buckets.append((scope, lowest))
+
+            axis = scope.index(var)
+            candidates = np.moveaxis(np.concatenate([lowest, second], axis=axis), axis, 0)
+            message_lowest, message_second = self.__lowest_two(candidates)
+            place((scope[:axis] + scope[axis+1:], message_lowest, message_second))
+
+        _, lowest, second = self.__combine(finished) if finished else ((), np.zeros(()), np.full((), math.inf))
+        result = SimpleNamespace()
+        result.best_obj = float(lowest)
+        result.second_best_obj = float(second) if second != math.inf else result.best_obj
+        result.gap = result.second_best_obj - result.best_obj
+        result.solutions = sorted(self.__trace_back(buckets, max_solutions))
+        result.width = self.width
+        return result
+
+    def __trace_back(self, buckets, max_solutions) :
+        """ Enumerates the optimal solutions, deciding variables in reverse elimination order. Every
+        variable in a bucket's scope was eliminated later, so it is already decided. """
+        assignment = [0 for _ in range(self.variable_count)]
+        def tied_values(position) :
+            scope, lowest = buckets[position]
+            var = self.order[position]
+            energies = lowest[tuple(slice(None) if other == var else assignment[other] for other in scope)]
+            return [int(value) for value in np.flatnonzero(isclose(energies, energies.min()))]
+
+        if not self.order :
+            return [()]
+        solutions = []
+        choices = [tied_values(len(self.order) - 1)] # Depth first, the values left to try at each depth
+        while choices :
+            if not choices[-1] :
+                choices.pop()
+                continue
+            position = len(self.order) - len(choices)
+            assignment[self.order[position]] = choices[-1].pop()
+            if position > 0 :
+                choices.append(tied_values(position - 1))
+                continue
+            solutions.append(tuple(assignment))
+            if max_solutions is not None and len(solutions) >= max_solutions :
+                break
+        return solutions
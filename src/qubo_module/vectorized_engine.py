@@ -0,0 +1,200 @@
+"""
+A numpy based evaluation engine for the brute force solver. The model is stored as a dense
+coefficient matrix, and energies are evaluated for whole blocks of assignments at once.
+"""
+from types import SimpleNamespace
+
+import numpy as np
+
+REL_TOL = 1e-6
+
+def assignment_bits(count, width) :
+    """ Returns a (count, width) array with the bits of 0..count-1, most significant bit first. This
+    matches the order that itertools.product([0,1], repeat=width) enumerates assignments in. """
+    shifts = np.arange(width - 1, -1, -1, dtype=np.int64)
+    return ((np.arange(count, dtype=np.int64)[:, None] >> shifts) & 1).astype(np.int8)
+
+def index_to_solution(index, variable_count) :
+    """ Converts an assignment index back into the solution tuple the solver reports """
+    return tuple((index >> (variable_count - 1 - i)) & 1 for i in range(variable_count))
+
+def isclose(energies, target) :
+    """ Vectorized equivalent of math.isclose(energy, target, rel_tol=REL_TOL) """
+    return np.abs(energies - target) <= REL_TOL * np.maximum(np.abs(energies), abs(target))
+
+def dense_model(variable_count, linear_coeffs, quadratic_coeffs, dtype=np.float64) :
+    """ Returns the model as a (linear vector, strictly upper triangular matrix) pair. The diagonal is
+    folded into the linear terms since x*x == x for binary x. """
+    linear = np.zeros(variable_count, dtype=dtype)
+    upper = np.zeros((variable_count, variable_count), dtype=dtype)
+    for var, coeff in linear_coeffs :
+        linear[var] += coeff
+    for v1, v2, coeff in quadratic_coeffs :
+        if v1 == v2 :
+            linear[v1] += coeff
+        else :
+            upper[min(v1, v2), max(v1, v2)] += coeff
+    return linear, upper
+
+class VectorizedEngine :
+    """ Evaluates the energies of blocks of 2**block_bits assignments as matrix operations.
+
+    The low `block_bits` variables are enumerated inside a block, and the remaining high variables
+    form a fixed prefix per block. Assignment index `prefix * 2**block_bits + i` matches the order
+    of itertools.product, with variable 0 as the most significant bit.
+
+    With exact=True the coefficients must be integers. Energies are then evaluated in int64 and
+    compared for degeneracy with plain equality instead of a relative tolerance. """
+    MAX_VARIABLES = 30
+    BLOCK_BITS = 16
+
+    def __init__(self, variable_count, linear_coeffs, quadratic_coeffs, block_bits=None, exact=False) :
+        self.variable_count = variable_count
+        self.exact = exact
+        self.dtype = np.int64 if exact else np.float64
+        if block_bits is None :
+            block_bits = VectorizedEngine.BLOCK_BITS
+        self.block_bits = min(block_bits, variable_count)
+        self.prefix_bits = variable_count - self.block_bits
+
+        self.linear, self.upper = dense_model(variable_count, linear_coeffs, quadratic_coeffs, self.dtype)
+
+        high = slice(0, self.prefix_bits)
+        low = slice(self.prefix_bits, variable_count)
+        self.high_linear = self.linear[high]
+        self.high_upper = self.upper[high, high]
+        self.low_linear = self.linear[low]
+        self.cross = self.upper[high, low] # Couplings between the prefix and the block variables
+
+        # The low variables are split into two halves, so the linear part of each block can be
+        # computed as an outer sum instead of a (2**block_bits, block_bits) matrix product.
+        self.split_bits = self.block_bits // 2
+        self.first_bits = assignment_bits(2**(self.block_bits - self.split_bits), self.block_bits - self.split_bits)
+        self.second_bits = assignment_bits(2**self.split_bits, self.split_bits)
+
+        low_bits = assignment_bits(2**self.block_bits, self.block_bits).astype(self.dtype)
+        self.low_quadratic = ((low_bits @ self.upper[low, low]) * low_bits).sum(axis=1)
+
+    @property
+    def block_size(self) :
+        """ The number of assignments evaluated per block """
+        return 2**self.block_bits
+
+    @property
+    def block_count(self) :
+        """ The number of blocks needed to cover every assignment """
+        return 2**self.prefix_bits
+
+    def block_energies(self, prefix) :
+        """ Returns the energies of every assignment in the block with the given prefix """
+        prefix_bits = np.array(index_to_solution(prefix, self.prefix_bits), dtype=self.dtype)
+        offset = prefix_bits @ self.high_linear + prefix_bits @ self.high_upper @ prefix_bits
+        low_linear = self.low_linear + prefix_bits @ self.cross
+
+        split = self.block_bits - self.split_bits
+        first = self.first_bits @ low_linear[:split]
+        second = self.second_bits @ low_linear[split:]
+        return self.low_quadratic + (first[:, None] + second[None, :]).ravel() + offset
+
+    def tied(self, energies, target) :
+        """ Which of the energies are degenerate with the target """
+        if self.exact :
+            return energies == target
+        return isclose(energies, target)
+
+    def blocks(self) :
+        """ Yields (first assignment index, energies) for every block, in enumeration order """
+        for prefix in range(self.block_count) :
+            yield prefix * self.block_size, self.block_energies(prefix)
+
+    def block_assignments(self, prefix, rows=None) :
+        """ Returns the assignments in the block with the given prefix as an int8 array with one
+        column per variable. rows optionally selects a subset of the block. """
+        low_bits = assignment_bits(self.block_size, self.block_bits)
+        if rows is not None :
+            low_bits = low_bits[rows]
+        assignments = np.empty((low_bits.shape[0], self.variable_count), dtype=np.int8)
+        assignments[:, :self.prefix_bits] = index_to_solution(prefix, self.prefix_bits)
+        assignments[:, self.prefix_bits:] = low_bits
+        return assignments
+
+    def chunks(self, max_energy=None, best_obj=None) :
+        """ Yields a SimpleNamespace per block with the assignment indices, assignments and energies
+        of the block. Assignments above max_energy, or not tied with best_obj, are filtered out. """
+        for prefix in range(self.block_count) :
+            energies = self.block_energies(prefix)
+            keep = None
+            if max_energy is not None :
+                keep = energies <= max_energy
+            if best_obj is not None :
+                optimal = self.tied(energies, best_obj)
+                keep = optimal if keep is None else keep & optimal
+
+            chunk = SimpleNamespace()
+            if keep is None :
+                chunk.indices = prefix * self.block_size + np.arange(self.block_size, dtype=np.int64)
+                chunk.assignments = self.block_assignments(prefix)
+                chunk.energies = energies
+            else :
+                rows = np.flatnonzero(keep)
+                if len(rows) == 0 :
+                    continue
+                chunk.indices = prefix * self.block_size + rows
+                chunk.assignments = self.block_assignments(prefix, rows)
+                chunk.energies = energies[rows]
+            yield chunk
+
+    def energy_bounds(self, prefixes) :
+        """ Returns the (lowest, highest) energy over the blocks with the given prefixes """
+        lowest = 0
+        highest = 0
+        for prefix in prefixes :
+            energies = self.block_energies(prefix)
+            lowest = min(lowest, energies.min().item())
+            highest = max(highest, energies.max().item())
+        return lowest, highest
+
+    def collect_solutions(self, prefixes, best_obj) :
+        """ Returns the solutions tied with best_obj in the blocks with the given prefixes, along with
+        the lowest energy that is not tied (None if every assignment is tied) """
+        solutions = []
+        second_best_obj = None
+        for prefix in prefixes :
+            energies = self.block_energies(prefix)
+            optimal = self.tied(energies, best_obj)
+            start = prefix * self.block_size
+            for i in np.flatnonzero(optimal) :
+                solutions.append(index_to_solution(start + int(i), self.variable_count))
+            if not optimal.all() :
+                lowest = energies[~optimal].min().item()
+                if second_best_obj is None or lowest < second_best_obj :
+                    second_best_obj = lowest
+        return solutions, second_best_obj
+
+    def solve(self, step=None) :
+        """ Returns the same result as BruteForceSolver.solve(), evaluated block by block. step, if
+        given, is called as step(phase, evaluated) after each block of each pass. """
+        result = SimpleNamespace()
+
+        # First pass to calculate the optimal objective
+        result.best_obj, result.second_best_obj = self.energy_bounds(self.__pass_prefixes('optimum_pass', step))
+
+        # Second pass to construct the optimal solution set, and the gap
+        result.solutions, second_best_obj = self.collect_solutions(self.__pass_prefixes('solution_pass', step),
+                                                                   result.best_obj)
+        if second_best_obj is not None :
+            result.second_best_obj = min(result.second_best_obj, second_best_obj)
+
+        result.gap = result.second_best_obj - result.best_obj
+        return result
+
+    def __pass_prefixes(self, phase, step) :
+        """ The prefix of every block, calling step after each block if it is given """
+        if step is None :
+            return range(self.block_count)
+        return self.__stepped_prefixes(phase, step)
+
+    def __stepped_prefixes(self, phase, step) :
+        for prefix in range(self.block_count) :
+            yield prefix
+            step(phase, (prefix + 1) * self.block_size)
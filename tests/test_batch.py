@@ -0,0 +1,59 @@
+""" Tests for batch solving and its result cache """
+#pylint: disable=missing-function-docstring line-too-long
+
+import pytest
+from qubo_module.batch import BatchSolver, canonical_model, solve_many
+from qubo_module.brute_force_solver import BruteForceSolver
+from test_brute_force_solver import random_qubo, solution_str
+
+def test_canonical_model() :
+    key, linear, quadratic = canonical_model({'A' : 1, 'B' : 2}, {('B', 'A') : -1, ('A', 'A') : 3, ('C', 'B') : 1})
+    assert linear == {0 : 4.0, 1 : 2.0, 2 : 0.0}
+    assert quadratic == {(0, 1) : -1.0, (1, 2) : 1.0}
+
+    # Renaming variables and reordering couplings keeps the key, changing a coefficient doesn't
+    assert canonical_model({'x' : 1.0, 'y' : 2}, {('x', 'x') : 3, ('y', 'z') : 1, ('x', 'y') : -1})[0] == key
+    assert canonical_model({'A' : 1, 'B' : 2}, {('B', 'A') : -1, ('A', 'A') : 3, ('C', 'B') : 2})[0] != key
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_matches_individual_solves(workers) :
+    models = [random_qubo(3 + seed % 8, seed) for seed in range(30)]
+    results = dict(solve_many(models, workers=workers, chunk_size=4))
+    assert sorted(results) == list(range(30))
+    for index, model in enumerate(models) :
+        assert solution_str(results[index]) == solution_str(BruteForceSolver(*model).solve())
+
+def test_duplicates_are_solved_once() :
+    models = [random_qubo(6, seed % 3) for seed in range(9)]
+    renamed = {f'w{name}' : coeff for name, coeff in models[0][0].items()}, \
+              {(f'w{a}', f'w{b}') : coeff for (a, b), coeff in models[0][1].items()}
+    with BatchSolver(workers=1, chunk_size=2) as solver :
+        results = dict(solver.solve_many(models + [renamed]))
+        assert (solver.misses, solver.hits) == (3, 7)
+        assert results[9] is results[0]
+        assert len(solver.cache) == 3
+
+        # The cache carries over to the next batch
+        list(solver.solve_many(models[:3]))
+        assert (solver.misses, solver.hits) == (3, 10)
+
+def test_pool_persists_between_batches() :
+    with BatchSolver(workers=2, chunk_size=1) as solver :
+        list(solver.solve_many([random_qubo(5, 1), random_qubo(5, 2)]))
+        pool = solver.pool
+        list(solver.solve_many([random_qubo(5, 3)]))
+        assert solver.pool is pool
+    assert solver.pool is None
+
+def test_engine_options() :
+    models = [random_qubo(10, seed) for seed in range(3)]
+    results = dict(solve_many(models, workers=1, engine='vectorized', block_bits=4))
+    assert solution_str(results[2]) == solution_str(BruteForceSolver(*models[2]).solve())
+
+def test_invalid() :
+    with pytest.raises(ValueError) as error :
+        BatchSolver(workers=0)
+    assert str(error.value) == 'Invalid worker count: 0'
+    with pytest.raises(ValueError) as error :
+        BatchSolver(chunk_size=0)
+    assert str(error.value) == 'Invalid chunk size: 0'
@@ -2,9 +2,13 @@
 #pylint: disable=missing-function-docstring line-too-long
 from math import isclose
 import itertools
+import random
 import pytest
-from qubo_module.boolean_set_module import BooleanSetModule
+import numpy as np
+from qubo_module.boolean_set_module import (BITS_MISMATCH, DECODE_REASONS, DECODED, MULTIPLE_INDICATORS,
+                                            BooleanSetModule, ElementDecoder)
 from qubo_module.brute_force_solver import BruteForceSolver
+from qubo_module.embedding_verifier import verify_embedding
 
 def test_invalid_input_wrong_type() :
     with pytest.raises(ValueError) as error :
@@ -73,24 +77,18 @@ def element_to_string(x) :
 def validate_set_module(set_str) :
     module = BooleanSetModule(set_str)
     embedding = module.embed()
-    result = BruteForceSolver(embedding.linear, embedding.quadratic).solve()
-    optimal_obj = result.best_obj
+    solver = BruteForceSolver(embedding.linear, embedding.quadratic)
+    optimal_obj = solver.solve().best_obj
 
-    # Each element should appear exactly once
+    # Every element should be decoded from some solution, and nothing else can be optimal
     actual_elements = set()
-    def validate_embedding(solution, obj) :
-        element, _ = embedding.map_to_element(solution)
-        if element is not None :
-            #assert isclose(obj, optimal_obj, rel_tol=1e-6)
-            element_str = element_to_string(element)
-            #assert not element_str in actual_elements # Each element should be in exactly one optimal solution
-            actual_elements.add(element_str)
-        else :
+    for chunk in solver.iter_solution_chunks() :
+        elements, _ = embedding.map_to_elements(chunk.assignments, solver.var_name_by_idx)
+        decoded = elements >= 0
+        actual_elements.update(element_to_string(module.elements[element]) for element in np.unique(elements[decoded]))
+        for obj in chunk.energies[~decoded] :
             assert not isclose(obj, optimal_obj, rel_tol=1e-6)
 
-    solver = BruteForceSolver(embedding.linear, embedding.quadratic)
-    solver.for_each_solution(validate_embedding)
-
     assert actual_elements == module.element_string_set
     assert len(actual_elements) == set_str.count('|')+1
 
@@ -122,16 +120,86 @@ def test_embedding_three_variable_sets() :
             continue # We don't currently only support sets that contain zero
         validate_set_module(subset_str)
 
-@pytest.mark.skip(reason="takes super long because we are doing an exponential operaton per powerset entry of an exponential")
 def test_embedding_four_variable_sets() :
-    states = [''.join(x) for x in list(itertools.product('01', repeat=4))]
+    # Full enumeration per powerset entry is too slow here, so this only minimizes over the indicators,
+    # for a seeded sample of the 2^15 sets that contain zero, along with the full set
+    others = [''.join(x) for x in itertools.product('01', repeat=4)][1:]
+    rng = random.Random(4)
+    subsets = [[state for state in others if rng.random() < 0.5] for _ in range(1000)] + [others]
+    for subset in subsets :
+        subset_str = '|'.join(['0000'] + subset)
+        result = verify_embedding(BooleanSetModule(subset_str))
+        assert result.correct, subset_str
+        assert len(subset) == 15 or result.gap > 0
+
+@pytest.mark.parametrize('set_str, gap', [
+    ('0000|1111', 2.5),
+    ('0000|0011|0101|0110|1001|1010|1100|1111', 2.5), # Even parity
+    ('0000|0001|0010|0100|1000', 20),
+    ('0000|1000|1100|1110|1111', 2.5),
+])
+def test_embedding_four_variable_gaps(set_str, gap) :
+    result = verify_embedding(BooleanSetModule(set_str))
+    assert result.correct
+    assert result.best_obj == 0
+    assert result.gap == gap
+    assert result.missing == []
+    assert result.spurious == []
+
+def test_compact_embedding_matches_embed() :
+    states = [''.join(x) for x in list(itertools.product('01', repeat=3))]
     for subset in allsubsets(states) :
-        if len(subset) == 0 :
+        if '000' not in subset :
             continue
-        subset_str='|'.join(subset)
-        if '0000' not in subset_str :
-            continue # We don't currently only support sets that contain zero
-        validate_set_module(subset_str)
+        module = BooleanSetModule('|'.join(subset))
+        embedding = module.embed()
+        compact = module.embed_compact()
+        assert compact.variable_count == 3 + len(subset)
+        assert compact.to_dicts() == (embedding.linear, embedding.quadratic)
+
+def test_compact_embedding_duplicate_elements() :
+    module = BooleanSetModule('00|11|00|10')
+    embedding = module.embed()
+    assert module.embed_compact().to_dicts() == (embedding.linear, embedding.quadratic)
+
+def test_compact_embedding_ids() :
+    compact = BooleanSetModule('00|11').embed_compact()
+    assert compact.variable_name(0) == 'bit_0'
+    assert compact.variable_name(3) == 'indicator_[1, 1]'
+    assert compact.linear_ids.tolist() == [0, 1, 3]
+    assert compact.quadratic_ids.tolist() == [[0, 3], [1, 3], [3, 2]]
+    assert compact.quadratic_coeffs.tolist() == [-15, -15, 30]
+
+def test_compact_embedding_requires_zero() :
+    with pytest.raises(NotImplementedError) :
+        BooleanSetModule('11').embed_compact()
+
+@pytest.mark.parametrize('input_set', ['0|1', '00|01|11', '000|011|101|110', '000|011|011'])
+def test_batch_decoding_matches_map_to_element(input_set) :
+    module = BooleanSetModule(input_set)
+    embedding = module.embed()
+    solver = BruteForceSolver(embedding.linear, embedding.quadratic)
+    chunk = next(solver.iter_solution_chunks(chunk_size=2**solver.variable_count))
+    elements, reasons = embedding.map_to_elements(chunk.assignments, solver.var_name_by_idx)
+
+    for assignment, element, reason in zip(chunk.assignments, elements, reasons) :
+        expected_element, expected_reason = module.map_to_element(dict(zip(solver.var_name_by_idx, assignment.tolist())))
+        assert DECODE_REASONS[reason] == expected_reason
+        assert (element == -1) == (expected_element is None)
+        if expected_element is not None :
+            assert module.elements[element] == expected_element
+
+def test_batch_decoding_reasons() :
+    module = BooleanSetModule('00|01|11')
+    names = ['bit_0', 'bit_1', 'indicator_[0, 1]', 'indicator_[1, 1]']
+    decoder = ElementDecoder(module, names)
+    elements, reasons = decoder.decode(np.array([[0, 0, 0, 0], [0, 1, 1, 0], [1, 1, 1, 1], [1, 0, 0, 0]], dtype=np.int8))
+    assert elements.tolist() == [0, 1, -1, -1]
+    assert reasons.tolist() == [DECODED, DECODED, MULTIPLE_INDICATORS, BITS_MISMATCH]
+
+    with pytest.raises(ValueError) as error :
+        ElementDecoder(module, names[:3])
+    assert str(error.value) == "Variable 'indicator_[1, 1]' is not in the variable order"
 
 if __name__ == '__main__' :
-    test_embedding_three_variable_sets()
\ No newline at end of file
+    test_embedding_three_variable_sets()
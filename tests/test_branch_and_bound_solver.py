@@ -0,0 +1,68 @@
+""" Tests for the branch-and-bound solver, aimed at its bounds: degenerate models that nothing can be
+pruned from, frustrated ones where the bounds are loose, and structured ones they have to cut down """
+#pylint: disable=missing-function-docstring line-too-long
+
+import time
+import pytest
+from qubo_module.boolean_set_module import BooleanSetModule
+from qubo_module.branch_and_bound_solver import BranchAndBoundSolver
+from qubo_module.brute_force_solver import BruteForceSolver
+from qubo_module.variable_elimination_solver import VariableEliminationSolver
+from test_brute_force_solver import disjoint_union, solution_str, xor_chain
+
+def test_simple_models() :
+    assert solution_str(BranchAndBoundSolver({'A' : 0}, {}).solve()) == "0/0 0|1"
+    assert solution_str(BranchAndBoundSolver({'A':1, 'B':-1}, { ('A','B') : -2 }).solve()) == "-2/-1 11"
+    assert solution_str(BranchAndBoundSolver({}, {}).solve()) == "0/0 "
+
+def test_every_assignment_tied() :
+    # Nothing can be pruned, and with no second level the gap is zero
+    result = BranchAndBoundSolver({f'v{i}' : 0 for i in range(10)}, {}).solve()
+    assert len(result.solutions) == 2**10
+    assert result.best_obj == result.second_best_obj == 0
+
+@pytest.mark.parametrize('field', [4, 5, 6])
+def test_frustrated_clique(field) :
+    """ Every variable wants to be on, every pair repels, so the optimum is a large tie between subsets
+    of one size, and the coupling charging bound is far below it """
+    linear = {i : -field for i in range(12)}
+    quadratic = {(i, j) : 2 for i in range(12) for j in range(i + 1, 12)}
+    expected = BruteForceSolver(linear, quadratic, engine='vectorized').solve()
+    result = BranchAndBoundSolver(linear, quadratic).solve()
+    assert solution_str(result) == solution_str(expected)
+    assert len(result.solutions) > 200
+
+def test_suffix_bound_prunes_chain() :
+    linear, quadratic = xor_chain(6)
+    solver = BranchAndBoundSolver(linear, quadratic)
+    assert solver.variable_count == 37
+    result = solver.solve()
+    assert result.nodes < 2**15
+    assert solution_str(result) == solution_str(VariableEliminationSolver(linear, quadratic).solve())
+
+def test_beyond_brute_force_range() :
+    """ Six disjoint copies of an xor embedding, 42 variables. Each copy has 5 optimal solutions, since
+    the free zero element indicator doubles up the all zero solution. """
+    embedding = BooleanSetModule('000|011|101|110').embed()
+    solver = BranchAndBoundSolver(*disjoint_union(*[(embedding.linear, embedding.quadratic)] * 6))
+    assert solver.variable_count == 42
+    result = solver.solve()
+    assert len(result.solutions) == 5**6
+    assert result.best_obj == 0
+    assert result.gap == 5
+
+def test_biased_xor_chain() :
+    """ 61 variables of chained xor modules, where every b bit costs 1. Every chain with the b bits
+    at zero is optimal, but free suffixes look cheap to a bound that ignores their internal penalties. """
+    linear, quadratic = xor_chain(10)
+    for i in range(10) :
+        linear[('b', i)] += 1
+    solver = BranchAndBoundSolver(linear, quadratic)
+    assert solver.variable_count == 61
+
+    start = time.perf_counter()
+    result = solver.solve()
+    assert time.perf_counter() - start < 15
+    expected = VariableEliminationSolver(linear, quadratic).solve()
+    assert solution_str(result) == solution_str(expected)
+    assert result.gap == pytest.approx(1)
@@ -1,5 +1,9 @@
 """ Basic tests for the brute force solver """
 
+import math
+import random
+import pytest
+from qubo_module.boolean_set_module import BooleanSetModule
 from qubo_module.brute_force_solver import BruteForceSolver
 
 def solution_str(result) :
@@ -10,9 +14,46 @@ def solution_str(result) :
     return f'{result.best_obj:.0f}/{result.second_best_obj:.0f} {solutions_str}'
 
 def qubo_assert(expected_result, linear, quadratic) :
-    """ Asserts that the solution to the provided model is as stated. """
-    result = BruteForceSolver(linear, quadratic).solve()
-    assert expected_result == solution_str(result)
+    """ Asserts that the solution to the provided model is as stated, for every engine. """
+    for engine in ENGINE_NAMES :
+        result = BruteForceSolver(linear, quadratic, engine=engine).solve()
+        assert expected_result == solution_str(result), engine
+
+def random_qubo(variable_count, seed, density=0.5, integer=True) :
+    """ Generates a random model. Integer coefficients give degenerate optimal solution sets. """
+    rng = random.Random(seed)
+    coeff = (lambda: rng.randint(-3, 3)) if integer else (lambda: rng.uniform(-3, 3))
+    names = [f'v{i}' for i in range(variable_count)]
+    linear = {name : coeff() for name in names}
+    quadratic = {}
+    for i in range(variable_count) :
+        for j in range(i+1, variable_count) :
+            if rng.random() < density :
+                quadratic[(names[i], names[j])] = coeff()
+    return linear, quadratic
+
+def disjoint_union(*models) :
+    """ Renames the variables of each model to (i, name), and merges them into one model """
+    linear, quadratic = {}, {}
+    for i, (piece_linear, piece_quadratic) in enumerate(models) :
+        linear.update({(i, name) : coeff for name, coeff in piece_linear.items()})
+        quadratic.update({((i, a), (i, b)) : coeff for (a, b), coeff in piece_quadratic.items()})
+    return linear, quadratic
+
+def xor_chain(length) :
+    """ A chain of xor modules, where c_i = c_(i-1) xor b_i, so module i shares a bit with module i-1 """
+    embedding = BooleanSetModule('000|011|101|110').embed()
+    def rename(name, i) :
+        return { 'bit_0' : ('c', i), 'bit_1' : ('b', i), 'bit_2' : ('c', i + 1) }.get(name, (name, i))
+    linear, quadratic = {}, {}
+    for i in range(length) :
+        for name, coeff in embedding.linear.items() :
+            linear[rename(name, i)] = linear.get(rename(name, i), 0) + coeff
+        for (a, b), coeff in embedding.quadratic.items() :
+            quadratic[(rename(a, i), rename(b, i))] = coeff
+    return linear, quadratic
+
+ENGINE_NAMES = ['python', 'vectorized', 'gray_code']
 
 
 def test_one_variable() :
@@ -43,6 +84,332 @@ def test_xor() :
                     ('X', 'Y'):100, ('X', 'Z'):100, ('Y','Z'):100
                 })
 
+def test_unknown_engine() :
+    with pytest.raises(ValueError) as error :
+        BruteForceSolver({'A' : 1}, {}, engine='abacus')
+    assert str(error.value) == "Unknown engine 'abacus'"
+
+def test_max_variables_per_engine() :
+    linear, quadratic = random_qubo(20, seed=0)
+    with pytest.raises(ValueError) :
+        BruteForceSolver(linear, quadratic)
+    BruteForceSolver(linear, quadratic, engine='vectorized')
+
+@pytest.mark.parametrize('engine', ENGINE_NAMES[1:])
+@pytest.mark.parametrize('seed', range(10))
+def test_random_models_match_python_engine(engine, seed) :
+    """ Every engine should exactly reproduce the reference solution set, including its order """
+    linear, quadratic = random_qubo(3 + seed, seed=seed, integer=seed % 2 == 0)
+    expected = BruteForceSolver(linear, quadratic).solve()
+    actual = BruteForceSolver(linear, quadratic, engine=engine).solve()
+    assert actual.solutions == expected.solutions
+    assert actual.best_obj == pytest.approx(expected.best_obj)
+    assert actual.second_best_obj == pytest.approx(expected.second_best_obj)
+    assert actual.gap == pytest.approx(expected.gap)
+
+def test_gray_code_non_integer_ties() :
+    """ Incremental updates must not split a tie that only differs by rounding error """
+    result = BruteForceSolver({'A' : 0.1, 'B' : 0.2}, {('A', 'B') : -0.3}, engine='gray_code').solve()
+    assert result.solutions == [(0, 0), (1, 1)]
+    assert result.best_obj == 0
+    assert result.gap == pytest.approx(0.1)
+
+def test_parallel_engine_matches_serial() :
+    """ Small blocks force the model to be split over many shards """
+    linear, quadratic = random_qubo(14, seed=3)
+    expected = BruteForceSolver(linear, quadratic, engine='vectorized').solve()
+    actual = BruteForceSolver(linear, quadratic, engine='parallel', workers=2, shard_bits=3, block_bits=6).solve()
+    assert actual.solutions == expected.solutions
+    assert actual.best_obj == expected.best_obj
+    assert actual.second_best_obj == expected.second_best_obj
+
+def test_parallel_engine_invalid_workers() :
+    with pytest.raises(ValueError) as error :
+        BruteForceSolver({'A' : 1}, {}, engine='parallel', workers=0)
+    assert str(error.value) == 'Invalid worker count: 0'
+
+def test_solution_chunks_match_for_each_solution() :
+    linear, quadratic = random_qubo(7, seed=4)
+    solver = BruteForceSolver(linear, quadratic)
+    expected = []
+    solver.for_each_solution(lambda solution, obj : expected.append(
+        (tuple(solution[name] for name in solver.var_name_by_idx), obj)))
+
+    actual = []
+    for chunk in solver.iter_solution_chunks(chunk_size=16) :
+        assert len(chunk.energies) == 16
+        for assignment, energy in zip(chunk.assignments, chunk.energies) :
+            actual.append((tuple(int(bit) for bit in assignment), energy))
+    assert actual == expected
+
+def test_solution_chunks_filters() :
+    linear, quadratic = random_qubo(8, seed=5)
+    solver = BruteForceSolver(linear, quadratic)
+    result = solver.solve()
+
+    optimal = []
+    for chunk in solver.iter_solution_chunks(chunk_size=8, optimal_only=True) :
+        optimal.extend(tuple(int(bit) for bit in assignment) for assignment in chunk.assignments)
+    assert optimal == result.solutions
+
+    count = 0
+    for chunk in solver.iter_solution_chunks(chunk_size=8, max_energy=result.second_best_obj) :
+        assert (chunk.energies <= result.second_best_obj).all()
+        count += len(chunk.energies)
+    assert count > len(result.solutions)
+
+def test_solution_chunks_invalid_size() :
+    with pytest.raises(ValueError) as error :
+        next(BruteForceSolver({'A' : 1}, {}).iter_solution_chunks(chunk_size=3))
+    assert str(error.value) == 'chunk_size must be a power of two, got 3'
+
+@pytest.mark.parametrize('engine', ['python', 'vectorized'])
+def test_solution_chunks_exact(engine) :
+    linear, quadratic = {'A' : 1/3, 'B' : -0.5, 'C' : 0}, { ('A','B') : -2/3, ('B','C') : 1/6 }
+    solver = BruteForceSolver(linear, quadratic, engine=engine, exact=True)
+    expected = solver.solve()
+    chunks = list(solver.iter_solution_chunks(chunk_size=4, optimal_only=True))
+    assert [tuple(assignment.tolist()) for chunk in chunks for assignment in chunk.assignments] == expected.solutions
+    assert chunks[0].energies.tolist() == pytest.approx([expected.best_obj])
+
+    energies = [energy for chunk in solver.iter_solution_chunks(chunk_size=4, max_energy=-2/3) for energy in chunk.energies]
+    assert sorted(energies) == pytest.approx([-5/6, -2/3])
+
+def test_solution_chunks_reuse_engine() :
+    linear, quadratic = random_qubo(8, seed=5)
+    solver = BruteForceSolver(linear, quadratic, engine='vectorized', block_bits=4)
+    chunks = solver.iter_solution_chunks(chunk_size=16)
+    assert next(chunks).energies.tolist() == solver.engine.block_energies(0).tolist()
+
+@pytest.mark.parametrize('engine', ENGINE_NAMES)
+def test_instrumented_solve(engine) :
+    linear, quadratic = random_qubo(10, seed=6)
+    expected = BruteForceSolver(linear, quadratic).solve()
+    result = BruteForceSolver(linear, quadratic, engine=engine, instrument=True).solve()
+    assert result.solutions == expected.solutions
+    assert result.profile.phases['model_indexing'] >= 0
+    assert result.profile.assignments_evaluated == 2**10 * (1 if engine == 'gray_code' else 2)
+    assert result.profile.evaluations_per_second > 0
+    assert not hasattr(BruteForceSolver(linear, quadratic, engine=engine).solve(), 'profile')
+
+@pytest.mark.parametrize('engine', ['python', 'vectorized'])
+def test_progress_callback(engine) :
+    linear, quadratic = random_qubo(10, seed=6)
+    calls = []
+    options = { 'block_bits' : 6 } if engine == 'vectorized' else {}
+    result = BruteForceSolver(linear, quadratic, engine=engine, progress=lambda *args : calls.append(args),
+                              progress_interval=256, **options).solve()
+    assert set(result.profile.phases) == {'model_indexing', 'optimum_pass', 'solution_pass'}
+    assert calls == [(phase, evaluated, 1024) for phase in ['optimum_pass', 'solution_pass']
+                     for evaluated in [256, 512, 768, 1024]]
+
+def test_progress_between_blocks() :
+    linear, quadratic = random_qubo(10, seed=6)
+    calls = []
+    BruteForceSolver(linear, quadratic, engine='vectorized', progress=lambda *args : calls.append(args),
+                     progress_interval=300, block_bits=7).solve()
+    assert calls == [(phase, evaluated, 1024) for phase in ['optimum_pass', 'solution_pass']
+                     for evaluated in [384, 640, 1024]]
+
+@pytest.mark.parametrize('engine', ['python', 'vectorized'])
+def test_exact_progress(engine) :
+    linear, quadratic = random_qubo(10, seed=6)
+    calls = []
+    options = { 'block_bits' : 6 } if engine == 'vectorized' else {}
+    result = BruteForceSolver(linear, quadratic, engine=engine, exact=True, progress=lambda *args : calls.append(args),
+                              progress_interval=512, **options).solve()
+    assert result.solutions == BruteForceSolver(linear, quadratic, engine=engine, exact=True, **options).solve().solutions
+    # With exact comparisons the python engine needs a single pass
+    phases = ['solve'] if engine == 'python' else ['optimum_pass', 'solution_pass']
+    assert calls == [(phase, evaluated, 1024) for phase in phases for evaluated in [512, 1024]]
+    assert set(result.profile.phases) == {'model_indexing', *phases}
+    assert result.profile.assignments_evaluated == 1024 * len(phases)
+
+def test_progress_unsupported_engine() :
+    with pytest.raises(ValueError) as error :
+        BruteForceSolver({'A' : 1}, {}, engine='gray_code', progress=print)
+    assert str(error.value) == "Progress reporting is not supported by the 'gray_code' engine"
+
+def test_top_k_levels() :
+    linear, quadratic = random_qubo(10, seed=8)
+    solver = BruteForceSolver(linear, quadratic)
+    energies = []
+    solver.for_each_solution(lambda solution, obj : energies.append(obj))
+    distinct = sorted(set(energies))
+
+    result = solver.solve_top_k(3)
+    assert [level.energy for level in result.levels] == distinct[:3]
+    assert [level.count for level in result.levels] == [energies.count(e) for e in distinct[:3]]
+    assert result.solutions == solver.solve().solutions
+    assert result.gap == distinct[1] - distinct[0]
+
+def test_top_k_single_level_keeps_gap() :
+    linear, quadratic = random_qubo(10, seed=8)
+    solver = BruteForceSolver(linear, quadratic)
+    expected = solver.solve()
+    result = solver.solve_top_k(1)
+    assert len(result.levels) == 1
+    assert result.gap > 0
+    assert result.gap == pytest.approx(expected.gap)
+    assert result.second_best_obj == pytest.approx(expected.second_best_obj)
+
+def test_top_k_caps_solutions_per_level() :
+    """ Every assignment of an empty model is optimal """
+    result = BruteForceSolver({'A' : 0, 'B' : 0, 'C' : 0}, {}).solve_top_k(2, max_solutions_per_level=2)
+    assert len(result.levels) == 1
+    assert result.levels[0].count == 8
+    assert result.solutions == [(0, 0, 0), (0, 0, 1)]
+    assert result.gap == 0
+
+def test_top_k_invalid() :
+    with pytest.raises(ValueError) as error :
+        BruteForceSolver({'A' : 1}, {}).solve_top_k(0)
+    assert str(error.value) == 'Invalid level count: 0'
+
+def test_prove_gap() :
+    linear, quadratic = random_qubo(12, seed=9)
+    solver = BruteForceSolver(linear, quadratic, engine='vectorized', block_bits=4)
+    gap = solver.solve().gap
+    assert solver.prove_gap(gap).proven
+    assert not solver.prove_gap(gap + 0.5).proven
+
+def test_prove_gap_stops_early() :
+    """ Two variables with a tiny gap, and a lot of irrelevant ones - the first block settles it """
+    linear = {f'v{i}' : 1 for i in range(14)}
+    linear.update({'A' : -1, 'B' : -0.5})
+    solver = BruteForceSolver(linear, {}, engine='vectorized', block_bits=4)
+    result = solver.prove_gap(10)
+    assert not result.proven
+    assert result.settled_early
+    assert result.evaluated == 16
+
+def test_solve_clamped_matches_filtered_enumeration() :
+    linear, quadratic = random_qubo(9, seed=10)
+    solver = BruteForceSolver(linear, quadratic)
+    assignments = [{'v0' : a, 'v4' : b} for a in (0, 1) for b in (0, 1)] + [{'v2' : 1}, {}]
+    for assignment, result in zip(assignments, solver.solve_clamped(assignments)) :
+        energies = {}
+        def record(solution, obj, assignment=assignment) :
+            if all(solution[name] == value for name, value in assignment.items()) :
+                energies[tuple(solution[name] for name in solver.var_name_by_idx)] = obj
+        solver.for_each_solution(record)
+
+        best = min(energies.values())
+        assert result.best_obj == pytest.approx(best)
+        assert result.solutions == sorted(s for s, e in energies.items() if e == best)
+        assert result.second_best_obj == pytest.approx(min(e for e in energies.values() if e != best))
+
+    assert solution_str(solver.solve_clamped([{}])[0]) == solution_str(solver.solve())
+
+def test_solve_clamped_everything() :
+    result = BruteForceSolver({'A':1, 'B':-1}, { ('A','B') : -2 }).solve_clamped([{'A' : 1, 'B' : 0}])[0]
+    assert solution_str(result) == '1/1 10'
+
+def test_solve_clamped_invalid() :
+    solver = BruteForceSolver({'A' : 1}, {})
+    with pytest.raises(ValueError) as error :
+        solver.solve_clamped([{'B' : 1}])
+    assert str(error.value) == "Unknown variable 'B'"
+    with pytest.raises(ValueError) as error :
+        solver.solve_clamped([{'A' : 2}])
+    assert str(error.value) == "Variable 'A' can only be clamped to 0 or 1, not 2"
+
+@pytest.mark.parametrize('engine', ['python', 'vectorized'])
+@pytest.mark.parametrize('seed', range(4))
+def test_exact_matches_tolerance_mode(engine, seed) :
+    linear, quadratic = random_qubo(9, seed)
+    expected = BruteForceSolver(linear, quadratic).solve()
+    result = BruteForceSolver(linear, quadratic, engine=engine, exact=True).solve()
+    assert solution_str(result) == solution_str(expected)
+    assert result.scale == 1
+    assert isinstance(result.best_obj, int)
+
+def test_exact_rational_coefficients() :
+    # Thirds and halves need a scale of 6, and the energies come back unscaled
+    linear, quadratic = {'A' : 1/3, 'B' : -0.5, 'C' : 0}, { ('A','B') : -2/3, ('B','C') : 1/6 }
+    for engine in ['python', 'vectorized'] :
+        result = BruteForceSolver(linear, quadratic, engine=engine, exact=True).solve()
+        assert result.scale == 6
+        assert result.best_obj == pytest.approx(-5/6)
+        assert result.second_best_obj == pytest.approx(-2/3)
+        assert result.solutions == [(1, 1, 0)]
+
+@pytest.mark.parametrize('engine', ['python', 'vectorized'])
+def test_exact_levels_and_gap(engine) :
+    # Same model as above, the top-k levels and gap are in the original units
+    linear, quadratic = {'A' : 1/3, 'B' : -0.5, 'C' : 0}, { ('A','B') : -2/3, ('B','C') : 1/6 }
+    solver = BruteForceSolver(linear, quadratic, engine=engine, exact=True)
+    result = solver.solve_top_k(2)
+    assert [level.energy for level in result.levels] == pytest.approx([-5/6, -2/3])
+    assert result.levels[0].solutions == [(1, 1, 0)]
+    assert result.gap == pytest.approx(1/6)
+    assert solver.solve_top_k(1).gap == pytest.approx(1/6)
+
+    assert solver.prove_gap(1/6).proven
+    assert not solver.prove_gap(0.5).proven
+    assert not BruteForceSolver(linear, quadratic).prove_gap(0.5).proven
+    assert solver.prove_gap(0.5).best_obj == pytest.approx(-5/6)
+
+def test_exact_zero_optimum() :
+    # Tiny energies next to a zero optimum are only told apart exactly
+    linear, quadratic = {'A' : 1e-9, 'B' : 0}, {}
+    assert solution_str(BruteForceSolver(linear, quadratic, exact=10**9).solve()) == '0/0 00|01'
+    assert BruteForceSolver(linear, quadratic, exact=10**9).solve().second_best_obj == pytest.approx(1e-9)
+
+def test_exact_boolean_set_embedding() :
+    # The penalty for the three bit element is 40/3
+    embedding = BooleanSetModule('000|011|111').embed()
+    expected = BruteForceSolver(embedding.linear, embedding.quadratic, engine='vectorized').solve()
+    result = BruteForceSolver(embedding.linear, embedding.quadratic, engine='vectorized', exact=True).solve()
+    assert result.scale == 3
+    assert result.solutions == expected.solutions
+    assert result.gap == 10/3
+
+def test_exact_invalid() :
+    with pytest.raises(ValueError) as error :
+        BruteForceSolver({'A' : math.pi}, {}, exact=True)
+    assert str(error.value) == 'Coefficients are not integers or rationals with small denominators, pass the scale as exact=<scale>'
+    with pytest.raises(ValueError) as error :
+        BruteForceSolver({'A' : 0.5}, {}, exact=1)
+    assert str(error.value) == 'Coefficient 0.5 is not a multiple of 1/1'
+    with pytest.raises(ValueError) as error :
+        BruteForceSolver({'A' : 1}, {}, engine='gray_code', exact=True)
+    assert str(error.value) == "Exact mode is not supported by the 'gray_code' engine"
+
+@pytest.mark.parametrize('block_bits', [None, 6, 8])
+@pytest.mark.parametrize('seed', range(12))
+def test_bit_sliced_engine_matches_python_engine(seed, block_bits) :
+    linear, quadratic = random_qubo(seed + 1, seed=seed, density=0.3 if seed % 2 else 0.8)
+    expected = BruteForceSolver(linear, quadratic).solve()
+    options = {} if block_bits is None else { 'block_bits' : block_bits }
+    actual = BruteForceSolver(linear, quadratic, engine='bit_sliced', **options).solve()
+    assert solution_str(actual) == solution_str(expected)
+    assert actual.gap == expected.gap
+
+def test_bit_sliced_engine_models() :
+    assert solution_str(BruteForceSolver({'A' : 0}, {}, engine='bit_sliced').solve()) == "0/0 0|1"
+    xor = BruteForceSolver({'A':5, 'B':5, 'C':5, 'X':10, 'Y':10, 'Z':10}, {
+        ('X', 'A'):-10, ('X', 'B'):-10, ('Y', 'A'):-10, ('Y', 'C'):-10, ('Z', 'B'):-10, ('Z', 'C'):-10,
+        ('X', 'Y'):100, ('X', 'Z'):100, ('Y','Z'):100 }, engine='bit_sliced')
+    assert solution_str(xor.solve()) == "0/5 000000|011001|101010|110100"
+
+    # Rational coefficients are scaled to integers, and the energies scaled back
+    result = BruteForceSolver({'A' : 1/3, 'B' : -0.5, 'C' : 0}, { ('A','B') : -2/3, ('B','C') : 1/6 }, engine='bit_sliced').solve()
+    assert result.best_obj == pytest.approx(-5/6)
+    assert result.second_best_obj == pytest.approx(-2/3)
+    assert result.solutions == [(1, 1, 0)]
+
+def test_bit_sliced_engine_beyond_one_block() :
+    linear, quadratic = random_qubo(20, seed=7, density=0.15)
+    expected = BruteForceSolver(linear, quadratic, engine='vectorized').solve()
+    actual = BruteForceSolver(linear, quadratic, engine='bit_sliced', block_bits=10).solve()
+    assert solution_str(actual) == solution_str(expected)
+
+def test_bit_sliced_engine_needs_integers() :
+    with pytest.raises(ValueError) as error :
+        BruteForceSolver({'A' : math.pi}, {}, engine='bit_sliced')
+    assert str(error.value) == 'The bit sliced engine needs integer coefficients, or rationals with small denominators'
+
 if __name__ == '__main__' :
     test_one_variable()
     test_two_variable()
\ No newline at end of file
@@ -0,0 +1,82 @@
+""" Tests for the canonicalizing embedding cache """
+#pylint: disable=missing-function-docstring line-too-long
+
+import itertools
+import numpy as np
+import pytest
+from qubo_module.boolean_set_module import BooleanSetModule
+from qubo_module.embedding_cache import EmbeddingCache, canonical_form
+from qubo_module.embedding_verifier import verify_embedding
+
+def test_canonical_form_of_permutations() :
+    key, _ = canonical_form(BooleanSetModule('000|001|011'))
+    for permuted in ['000|010|011', '000|100|110', '000|001|101'] :
+        assert canonical_form(BooleanSetModule(permuted))[0] == key
+    assert canonical_form(BooleanSetModule('000|011|101'))[0] != key
+
+def test_permuted_sets_share_an_entry() :
+    cache = EmbeddingCache()
+    for permuted in ['000|001|011', '000|010|011', '000|100|110', '000|001|101'] :
+        module = BooleanSetModule(permuted)
+        model = cache.embed(module)
+        assert verify_embedding(module, model).correct
+    assert cache.misses == 1
+    assert cache.hits == 3
+
+def test_unpermuted_set_matches_embed() :
+    module = BooleanSetModule('000|011|101|110')
+    model = EmbeddingCache().embed(module)
+    embedding = module.embed()
+    assert model.linear == embedding.linear
+    assert model.quadratic == embedding.quadratic
+
+def test_cached_model_decodes_in_batches() :
+    cache = EmbeddingCache()
+    cache.embed(BooleanSetModule('000|001|011'))
+    module = BooleanSetModule('000|100|110')
+    model = cache.embed(module)
+    assert cache.hits == 1
+    names = list(dict.fromkeys(list(model.linear) + [name for key in model.quadratic for name in key]))
+    elements, _ = model.map_to_elements(np.zeros((1, len(names)), dtype=np.int8), names)
+    assert module.elements[elements[0]] == [0, 0, 0]
+
+def test_cached_embeddings_are_correct() :
+    cache = EmbeddingCache()
+    states = [''.join(x) for x in itertools.product('01', repeat=3)]
+    for r in range(1, len(states) + 1) :
+        for subset in itertools.combinations(states, r) :
+            if '000' not in subset :
+                continue
+            module = BooleanSetModule('|'.join(subset))
+            model = cache.embed(module)
+            assert verify_embedding(module, model).correct, subset
+
+            solution = {name : 0 for name in model.linear}
+            solution.update({name : 0 for key in model.quadratic for name in key})
+            assert model.map_to_element(solution)[0] == [0, 0, 0]
+    assert cache.misses < cache.hits
+
+def test_lru_eviction() :
+    cache = EmbeddingCache(max_entries=2)
+    cache.embed(BooleanSetModule('00|01'))
+    cache.embed(BooleanSetModule('00|11'))
+    cache.embed(BooleanSetModule('00|01')) # hit, and now most recently used
+    cache.embed(BooleanSetModule('00|01|11')) # evicts 00|11
+    cache.embed(BooleanSetModule('00|11'))
+    assert (cache.hits, cache.misses) == (1, 4)
+    assert len(cache.entries) == 2
+
+def test_persistent_store(tmp_path) :
+    module = BooleanSetModule('0000|0011|0101')
+    first = EmbeddingCache(path=tmp_path).embed(module)
+
+    cache = EmbeddingCache(path=tmp_path)
+    second = cache.embed(BooleanSetModule('0000|1100|1010'))
+    assert (cache.hits, cache.misses) == (1, 0)
+    assert len(second.linear) == len(first.linear)
+    assert verify_embedding(BooleanSetModule('0000|1100|1010'), second).correct
+
+def test_invalid_max_entries() :
+    with pytest.raises(ValueError) as error :
+        EmbeddingCache(max_entries=0)
+    assert str(error.value) == 'Invalid max_entries: 0'
@@ -0,0 +1,49 @@
+""" Tests for verifying embeddings by minimizing over their internal variables """
+#pylint: disable=missing-function-docstring line-too-long
+
+import itertools
+from math import isclose
+from qubo_module.boolean_set_module import BooleanSetModule
+from qubo_module.brute_force_solver import BruteForceSolver
+from qubo_module.embedding_verifier import external_minimum_energies, verify_embedding
+
+def test_minimum_energies_match_brute_force() :
+    embedding = BooleanSetModule('000|011|101|110').embed()
+    expected = {}
+    def record(solution, obj) :
+        external = tuple(solution[f'bit_{i}'] for i in range(3))
+        expected[external] = min(obj, expected.get(external, obj))
+    BruteForceSolver(embedding.linear, embedding.quadratic).for_each_solution(record)
+
+    energies = external_minimum_energies(embedding.linear, embedding.quadratic, ['bit_0', 'bit_1', 'bit_2'])
+    for i, external in enumerate(itertools.product([0,1], repeat=3)) :
+        assert isclose(energies[i], expected[external], abs_tol=1e-9)
+
+def test_negative_internal_couplings() :
+    """ Internal variables that reward each other can't be pruned by their fields alone """
+    linear = {'x' : 0, 'a' : 1, 'b' : 1}
+    quadratic = {('a', 'b') : -3, ('x', 'a') : 1}
+    assert list(external_minimum_energies(linear, quadratic, ['x'])) == [-1, 0]
+
+def test_verify_xor() :
+    result = verify_embedding(BooleanSetModule('000|011|101|110'))
+    assert result.correct
+    assert result.best_obj == 0
+    assert result.gap == 5
+    assert result.missing == []
+    assert result.spurious == []
+
+def test_verify_detects_broken_embedding() :
+    module = BooleanSetModule('00|11')
+    embedding = module.embed()
+    embedding.linear['indicator_[1, 1]'] = 100 # Now 11 is never optimal
+    result = verify_embedding(module, embedding)
+    assert not result.correct
+    assert result.missing == [0b11]
+    assert result.spurious == []
+
+    embedding.linear['bit_1'] = -20 # and now 01 is the ground state
+    result = verify_embedding(module, embedding)
+    assert result.missing == [0b00, 0b11]
+    assert result.spurious == [0b01]
+    assert result.gap == 0 # the spurious ground state is itself the lowest non-member
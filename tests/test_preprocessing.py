@@ -0,0 +1,88 @@
+""" Tests for persistency fixing and component decomposition """
+#pylint: disable=missing-function-docstring line-too-long
+
+import pytest
+from qubo_module.brute_force_solver import BruteForceSolver
+from qubo_module.preprocessing import Preprocessor
+from test_brute_force_solver import disjoint_union, random_qubo, solution_str
+
+def test_fixes_dominated_variables() :
+    # A can't lower the energy, B always should be on, and with B on C is pushed off
+    preprocessor = Preprocessor(3, [(0, 2), (1, -3), (2, -1)], [(0, 1, -1), (1, 2, 2)])
+    assert preprocessor.fixed == {0 : 0, 1 : 1, 2 : 0}
+    assert preprocessor.offset == -3
+    assert not preprocessor.components
+
+def test_components() :
+    preprocessor = Preprocessor(5, [], [(0, 3, 1), (3, 4, -1), (1, 2, 1)], fix_variables=False)
+    assert preprocessor.components == [[0, 3, 4], [1, 2]]
+    assert preprocessor.component_model([0, 3, 4]) == ({0 : 0, 1 : 0, 2 : 0}, {(0, 1) : 1, (1, 2) : -1})
+
+@pytest.mark.parametrize('seed', range(6))
+def test_matches_full_solve(seed) :
+    linear, quadratic = disjoint_union(random_qubo(5, seed, density=0.6), random_qubo(4, seed + 100, density=0.6),
+                                       random_qubo(3, seed + 200, density=0.3))
+    # Strong fields that preprocessing can fix, coupled into the first piece
+    linear.update({'p' : 9, 'q' : -9})
+    quadratic.update({('p', (0, 'v0')) : -2, ('q', (0, 'v1')) : 3})
+    expected = BruteForceSolver(linear, quadratic, engine='vectorized').solve()
+    result = BruteForceSolver(linear, quadratic, preprocess=True).solve()
+    assert solution_str(result) == solution_str(expected)
+    assert result.gap == pytest.approx(expected.gap)
+
+def test_degenerate_components() :
+    linear, quadratic = disjoint_union(({'A' : 0}, {}), ({'A' : 1, 'B' : 1}, {('A', 'B') : -2}))
+    expected = BruteForceSolver(linear, quadratic).solve()
+    assert solution_str(BruteForceSolver(linear, quadratic, preprocess=True).solve()) == solution_str(expected)
+    assert solution_str(BruteForceSolver({'A' : 0, 'B' : 0}, {}, preprocess=True).solve()) == '0/0 00|01|10|11'
+
+def test_second_best_from_a_fixed_variable() :
+    # A and B are fixed, and flipping A with a margin of 1 is cheaper than moving the other component
+    linear, quadratic = {'A' : 1, 'B' : -5, 'C' : 0, 'D' : 0}, {('C', 'D') : -6}
+    expected = BruteForceSolver(linear, quadratic).solve()
+    result = BruteForceSolver(linear, quadratic, preprocess=True).solve()
+    assert solution_str(result) == solution_str(expected) == '-11/-10 0111'
+    assert result.fixed == {'A' : 0, 'B' : 1}
+
+def test_fully_fixed_beyond_the_variable_limit() :
+    # Every variable of the chain is fixed to 0, and the second best turns a single one on
+    linear = {i : 5 for i in range(24)}
+    quadratic = {(i, i + 1) : 1 for i in range(23)}
+    result = BruteForceSolver(linear, quadratic, preprocess=True).solve()
+    assert len(result.fixed) == 24
+    assert not result.component_sizes
+    assert solution_str(result) == '0/5 ' + '0' * 24
+    assert result.gap == 5
+
+@pytest.mark.parametrize('seed', range(6))
+def test_mostly_fixed_models_match_full_solve(seed) :
+    # Strong fields fix most variables, with couplings large enough that flips interact
+    linear, quadratic = random_qubo(10, seed, density=0.3)
+    linear = {name : coeff * 4 for name, coeff in linear.items()}
+    expected = BruteForceSolver(linear, quadratic, engine='vectorized').solve()
+    result = BruteForceSolver(linear, quadratic, preprocess=True).solve()
+    assert solution_str(result) == solution_str(expected)
+    assert result.gap == pytest.approx(expected.gap)
+
+def test_pieces_beyond_the_variable_limit() :
+    pieces = [random_qubo(12, seed) for seed in (1, 2)]
+    linear, quadratic = disjoint_union(*pieces)
+    result = BruteForceSolver(linear, quadratic, preprocess=True).solve()
+    bests = [BruteForceSolver(*piece, engine='vectorized').solve().best_obj for piece in pieces]
+    assert result.best_obj == sum(bests)
+    assert sum(result.component_sizes) + len(result.fixed) == 24
+    assert max(result.component_sizes) <= 12
+
+def test_preprocessing_with_instrumentation() :
+    linear, quadratic = disjoint_union(random_qubo(6, 3, density=0.6), random_qubo(5, 4, density=0.6))
+    calls = []
+    result = BruteForceSolver(linear, quadratic, preprocess=True, progress=lambda *args : calls.append(args),
+                              progress_interval=16).solve()
+    assert solution_str(result) == solution_str(BruteForceSolver(linear, quadratic, preprocess=True).solve())
+    assert {'model_indexing', 'preprocessing', 'optimum_pass', 'solution_pass'} <= set(result.profile.phases)
+    # Each component solve reports its own passes, ending at its own total, and flipping a fixed variable
+    # solves the components again
+    ends = [call for call in calls if call[1] == call[2]]
+    assert ends[:4] == [(phase, 2**size, 2**size) for size in result.component_sizes
+                        for phase in ['optimum_pass', 'solution_pass']]
+    assert result.profile.assignments_evaluated == sum(total for _, _, total in ends)
@@ -0,0 +1,85 @@
+""" Tests for the array backed model and solution set formats """
+#pylint: disable=missing-function-docstring line-too-long
+
+import numpy as np
+import pytest
+from qubo_module.boolean_set_module import BooleanSetModule
+from qubo_module.brute_force_solver import BruteForceSolver
+from qubo_module.qubo_model import PackedSolutions, QuboModel
+from test_brute_force_solver import random_qubo
+
+def test_round_trip_dicts() :
+    linear, quadratic = random_qubo(8, seed=3)
+    model = QuboModel.from_dicts(linear, quadratic)
+    assert model.variable_count == 8
+    assert model.index('v5') == 5
+    assert model.to_dicts() == (linear, quadratic)
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_save_and_load(tmp_path, mmap) :
+    embedding = BooleanSetModule('000|011|101|110').embed()
+    model = QuboModel.from_dicts(embedding.linear, embedding.quadratic)
+    path = tmp_path / 'model.qubo'
+    model.save(path)
+
+    loaded = QuboModel.load(path, mmap=mmap)
+    assert isinstance(loaded.quadratic_coeffs, np.memmap) == mmap
+    assert loaded.names == model.names
+    assert loaded.to_dicts() == (embedding.linear, embedding.quadratic)
+    assert loaded.quadratic_ids.dtype == np.int32
+
+def test_tuple_and_int_names(tmp_path) :
+    model = QuboModel.from_dicts({('a', 1) : 1.5, 7 : -1}, {(('a', 1), 7) : 2})
+    model.save(tmp_path / 'model.qubo')
+    assert QuboModel.load(tmp_path / 'model.qubo').to_dicts() == ({('a', 1) : 1.5, 7 : -1}, {(('a', 1), 7) : 2})
+
+    with pytest.raises(ValueError) as error :
+        QuboModel.from_dicts({1.5 : 1}, {}).save(tmp_path / 'bad.qubo')
+    assert str(error.value) == 'Cannot store variable name 1.5, names must be strings, ints or tuples of them'
+
+def test_empty_quadratic(tmp_path) :
+    QuboModel.from_dicts({'A' : 1}, {}).save(tmp_path / 'model.qubo')
+    loaded = QuboModel.load(tmp_path / 'model.qubo')
+    assert loaded.to_dicts() == ({'A' : 1}, {})
+    assert loaded.quadratic_ids.shape == (0, 2)
+
+def test_from_compact() :
+    compact = BooleanSetModule('000|011|101').embed_compact()
+    model = QuboModel.from_compact(compact)
+    assert model.to_dicts() == compact.to_dicts()
+
+def test_wrong_magic(tmp_path) :
+    PackedSolutions.from_solutions([(0, 1)], 2).save(tmp_path / 'solutions.bin')
+    with pytest.raises(ValueError) :
+        QuboModel.load(tmp_path / 'solutions.bin')
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_packed_solutions(tmp_path, mmap) :
+    result = BruteForceSolver({f'v{i}' : 0 for i in range(11)}, {('v0', 'v1') : 1}).solve()
+    packed = PackedSolutions.from_solutions(result.solutions, 11, names=[f'v{i}' for i in range(11)])
+    assert packed.bits.shape == (len(result.solutions), 2)
+    packed.save(tmp_path / 'solutions.bin')
+
+    loaded = PackedSolutions.load(tmp_path / 'solutions.bin', mmap=mmap)
+    assert len(loaded) == len(result.solutions)
+    assert list(loaded) == result.solutions
+    assert loaded[5] == result.solutions[5]
+    assert loaded.names == packed.names
+
+def test_packed_chunks() :
+    solver = BruteForceSolver(*random_qubo(10, seed=1))
+    chunk = next(solver.iter_solution_chunks(chunk_size=2**10))
+    packed = PackedSolutions.from_array(chunk.assignments)
+    assert np.array_equal(packed.to_array(), chunk.assignments)
+
+def test_packed_solutions_indexing() :
+    solutions = [(0, 1, 1), (1, 0, 0), (1, 1, 0)]
+    packed = PackedSolutions.from_solutions(solutions, 3)
+    assert packed[0] == (0, 1, 1)
+    assert packed[-1] == (1, 1, 0)
+    assert packed[np.int64(1)] == (1, 0, 0)
+    assert packed[0:2] == solutions[0:2]
+    assert packed[::-2] == solutions[::-2]
+    assert packed[3:] == []
+    with pytest.raises(TypeError) :
+        packed[1.0] #pylint: disable=pointless-statement
@@ -0,0 +1,70 @@
+""" Tests for the solver registry and lazy backend loading """
+#pylint: disable=missing-function-docstring line-too-long
+
+import os
+import subprocess
+import sys
+
+import pytest
+from qubo_module import registry
+from qubo_module.brute_force_solver import ENGINES, BruteForceSolver, engine_class
+from test_brute_force_solver import random_qubo, solution_str
+
+def test_limits_match_the_solvers() :
+    assert registry.SOLVERS['brute_force'].max_variables == BruteForceSolver.MAX_VARIABLES
+    for name in ENGINES :
+        assert registry.SOLVERS[name].max_variables == engine_class(name).MAX_VARIABLES
+
+def test_choose_solver() :
+    assert registry.choose_solver(10) == 'vectorized'
+    assert registry.choose_solver(26) == 'parallel'
+    assert registry.choose_solver(40) == 'branch_and_bound'
+    assert registry.choose_solver(40, exact=False) == 'simulated_annealing'
+    assert registry.choose_solver(80, exact=False) == 'simulated_annealing'
+    with pytest.raises(ValueError) as error :
+        registry.choose_solver(80)
+    assert str(error.value) == 'No registered solver can solve 80 variables exactly'
+
+def test_solve_by_name_and_automatically() :
+    linear, quadratic = random_qubo(9, seed=5)
+    expected = BruteForceSolver(linear, quadratic).solve()
+    for name in ['brute_force', 'gray_code', 'vectorized', 'branch_and_bound', 'variable_elimination'] :
+        result = registry.solve(linear, quadratic, solver=name)
+        assert solution_str(result) == solution_str(expected), name
+        assert result.solver == name
+
+    result = registry.solve(linear, quadratic)
+    assert result.solver == 'vectorized'
+    assert solution_str(result) == solution_str(expected)
+
+def test_options_are_passed_through() :
+    linear, quadratic = random_qubo(12, seed=1)
+    solver = registry.create_solver(linear, quadratic, solver='simulated_annealing', replicas=8, sweeps=10, seed=3)
+    assert (solver.replicas, solver.sweeps) == (8, 10)
+
+def test_register_external_solver() :
+    registry.register_solver('test_external', 'qubo_module.branch_and_bound_solver:BranchAndBoundSolver', exact=True,
+                             rank=-1, min_variables=5, max_variables=6)
+    try :
+        assert registry.choose_solver(6) == 'test_external'
+        assert registry.choose_solver(7) == 'vectorized'
+        with pytest.raises(ValueError) as error :
+            registry.register_solver('test_external', 'x:y', exact=True)
+        assert str(error.value) == "Solver 'test_external' is already registered"
+    finally :
+        del registry.SOLVERS['test_external']
+
+def test_unknown_solver() :
+    with pytest.raises(ValueError) as error :
+        registry.solve({'A' : 1}, {}, solver='quantum')
+    assert str(error.value) == "Unknown solver 'quantum'"
+
+def test_heavy_backends_are_imported_lazily() :
+    code = ('import sys; import qubo_module.boolean_set_module, qubo_module.registry, qubo_module.brute_force_solver; '
+            + 'print(any(name.startswith("ortools") for name in sys.modules), '
+            + '"qubo_module.simulated_annealing_solver" in sys.modules, '
+            + '"qubo_module.parallel_engine" in sys.modules, "qubo_module.bit_sliced_engine" in sys.modules)')
+    # The child gets this process's import path, however the tests were launched
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(path for path in sys.path if path))
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True, env=env).stdout
+    assert output.split() == ['False', 'False', 'False', 'False']
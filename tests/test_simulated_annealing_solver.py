@@ -0,0 +1,54 @@
+""" Tests for the simulated annealing solver """
+#pylint: disable=missing-function-docstring line-too-long
+
+import pytest
+from qubo_module.boolean_set_module import BooleanSetModule
+from qubo_module.brute_force_solver import BruteForceSolver
+from qubo_module.simulated_annealing_solver import SimulatedAnnealingSolver
+from test_brute_force_solver import disjoint_union, random_qubo, solution_str
+
+def test_invalid_inputs() :
+    with pytest.raises(ValueError) as error :
+        SimulatedAnnealingSolver({'A' : 1}, {}, replicas=0)
+    assert str(error.value) == 'Invalid replica count: 0'
+
+    with pytest.raises(ValueError) as error :
+        SimulatedAnnealingSolver({'A' : 1}, {}, schedule='cubic')
+    assert str(error.value) == "Unknown schedule 'cubic'"
+
+def test_simple_models() :
+    assert solution_str(SimulatedAnnealingSolver({'A':1, 'B':-1}, { ('A','B') : -2 }, seed=0).solve()) == "-2/-1 11"
+    assert solution_str(SimulatedAnnealingSolver({'A' : 0}, {}, seed=0).solve()) == "0/0 0|1"
+
+@pytest.mark.parametrize('seed', range(3))
+def test_more_sweeps_converge(seed) :
+    """ Longer schedules should leave more replicas in the ground state of a 20 variable model """
+    linear, quadratic = random_qubo(20, seed=seed, integer=False)
+    expected = BruteForceSolver(linear, quadratic, engine='vectorized').solve()
+    grounded = []
+    for sweeps in [3, 30, 300] :
+        result = SimulatedAnnealingSolver(linear, quadratic, replicas=64, sweeps=sweeps, seed=0).solve()
+        assert sum(count for _, _, count in result.samples) == 64
+        grounded.append(sum(count for _, energy, count in result.samples if energy == pytest.approx(expected.best_obj)))
+    assert grounded == sorted(grounded)
+    assert grounded[-1] >= 48
+    assert result.best_obj == pytest.approx(expected.best_obj)
+    assert set(result.solutions) <= set(expected.solutions)
+
+def test_seed_is_reproducible() :
+    linear, quadratic = random_qubo(20, seed=1, integer=False)
+    first = SimulatedAnnealingSolver(linear, quadratic, sweeps=50, seed=7).solve()
+    second = SimulatedAnnealingSolver(linear, quadratic, sweeps=50, seed=7).solve()
+    assert first.samples == second.samples
+
+def test_linear_schedule() :
+    solver = SimulatedAnnealingSolver({'A' : 1}, {}, sweeps=3, beta_range=(1, 3), schedule='linear')
+    assert solver.betas().tolist() == [1, 2, 3]
+
+def test_composed_embeddings() :
+    """ Eight disjoint copies of an xor embedding are 56 variables, well past brute force """
+    embedding = BooleanSetModule('000|011|101|110').embed()
+    linear, quadratic = disjoint_union(*[(embedding.linear, embedding.quadratic)] * 8)
+    result = SimulatedAnnealingSolver(linear, quadratic, replicas=16, sweeps=300, seed=0).solve()
+    assert result.best_obj == 0
+    assert result.samples[0][2] >= 1
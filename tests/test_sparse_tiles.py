@@ -0,0 +1,67 @@
+""" Tests for the array backed grid of cliques and bipartite cell tiles """
+#pylint: disable=missing-function-docstring line-too-long
+
+import numpy as np
+import pytest
+from qubo_module.boolean_set_module import BooleanSetModule
+from qubo_module.tile import BipartiteCellTile, GridOfCliquesTile
+from qubo_module.tile_mip_embedding import TileMipEmbedder
+
+def assert_consistent(tile) :
+    assert (tile.edge_i < tile.edge_j).all()
+    assert len(set(tile.coefficients)) == tile.edge_count
+    for var in range(tile.var_count) :
+        expected = sorted([j for i, j in tile.coefficients if i == var] + [i for i, j in tile.coefficients if j == var])
+        assert tile.neighbors(var).tolist() == expected
+        assert tile.degree(var) == len(expected)
+
+def test_invalid_inputs() :
+    with pytest.raises(ValueError) as error :
+        GridOfCliquesTile(rows=0, cols=1, clique_size=1)
+    assert str(error.value) == "Invalid rows: 0"
+
+    with pytest.raises(ValueError) as error :
+        BipartiteCellTile(rows=1, cols=1, shore_size=-1)
+    assert str(error.value) == "Invalid shore_size: -1"
+
+def test_single_clique() :
+    tile = GridOfCliquesTile(rows=1, cols=1, clique_size=3)
+    assert tile.var_count == 3
+    assert tile.coefficients == [(0, 1), (0, 2), (1, 2)]
+    assert tile.left.tolist() == tile.right.tolist() == tile.top.tolist() == tile.bottom.tolist() == [0, 1, 2]
+    assert len(tile.internal) == 0
+
+def test_grid_of_cliques() :
+    tile = GridOfCliquesTile(rows=3, cols=3, clique_size=2)
+    assert tile.var_count == 18
+    assert tile.edge_count == 9 + 2*2*3*2
+    assert tile.internal.tolist() == [8, 9]
+    assert tile.left.tolist() == [0, 1, 6, 7, 12, 13]
+    assert tile.neighbors(8).tolist() == [2, 6, 9, 10, 14]
+    assert_consistent(tile)
+
+def test_bipartite_cell() :
+    tile = BipartiteCellTile(rows=1, cols=1, shore_size=2)
+    assert tile.coefficients == [(0, 2), (0, 3), (1, 2), (1, 3)]
+    assert tile.top.tolist() == tile.bottom.tolist() == [0, 1]
+    assert tile.left.tolist() == tile.right.tolist() == [2, 3]
+
+def test_bipartite_lattice() :
+    tile = BipartiteCellTile(rows=3, cols=4, shore_size=4)
+    assert tile.var_count == 3*4*8
+    assert tile.edge_count == 3*4*16 + 2*4*4 + 3*3*4
+    views = np.concatenate([tile.left, tile.right, tile.top, tile.bottom, tile.internal])
+    assert sorted(views.tolist()) == list(range(tile.var_count))
+    assert max(tile.degree(v) for v in range(tile.var_count)) == 6
+    assert_consistent(tile)
+
+def test_hardware_scale() :
+    tile = BipartiteCellTile(rows=16, cols=16, shore_size=4)
+    assert tile.var_count == 2048
+    assert tile.edge_count == 6016
+
+def test_mip_embedding_on_sparse_tile() :
+    result = TileMipEmbedder(BipartiteCellTile(rows=1, cols=1, shore_size=1)).embed(BooleanSetModule('00|11'))
+    assert result.optimal
+    assert result.gap > 0
+    assert set(result.quadratic) == {(0, 1)}
@@ -0,0 +1,68 @@
+""" Tests for embedding boolean sets onto tiles by linear programming """
+#pylint: disable=missing-function-docstring line-too-long
+
+import itertools
+import pytest
+from qubo_module.boolean_set_module import BooleanSetModule
+from qubo_module.tile import FullyConnectedTile
+from qubo_module.tile_mip_embedding import TileMipEmbedder
+
+def energy(result, solution) :
+    total = sum(coeff * solution[i] for i, coeff in result.linear.items())
+    return total + sum(coeff * solution[i] * solution[j] for (i, j), coeff in result.quadratic.items())
+
+def assert_embedding(module, result) :
+    assert result.optimal
+    for solution_int, solution in enumerate(itertools.product([0,1], repeat=module.width)) :
+        if solution_int in module.element_set :
+            assert energy(result, solution) == pytest.approx(0)
+        else :
+            assert energy(result, solution) >= result.gap - 1e-6
+
+def test_requires_experimental_flag() :
+    with pytest.raises(NotImplementedError) :
+        BooleanSetModule('00|11').embed_onto_tile_mip(FullyConnectedTile(1, 0, 0))
+
+def test_equality_on_tile() :
+    module = BooleanSetModule('00|11')
+    module.enable_experimental_mip_embedding = True
+    tile = FullyConnectedTile(width=1, height=1, internal_bit_count=0)
+    result = module.embed_onto_tile_mip(tile)
+    assert result.gap > 0
+    assert set(result.linear) == {0, 1}
+    assert set(result.quadratic) == {(0, 1)}
+    assert_embedding(module, result)
+
+def test_embedder_reuse() :
+    tile = FullyConnectedTile(width=2, height=0, internal_bit_count=0)
+    embedder = TileMipEmbedder(tile)
+    modules = [BooleanSetModule(s) for s in ['000|111', '000|011|101|110', '001|010|100']]
+    for module, result in zip(modules, embedder.embed_many(modules)) :
+        assert_embedding(module, result)
+    assert list(embedder.patterns) == [3]
+    assert list(embedder.lps) == [3]
+
+    # No quadratic coefficients can make xor's 000 and 011 both optimal while 001 isn't
+    assert embedder.embed(modules[1]).gap == pytest.approx(0)
+
+def test_reused_lp_matches_fresh_lp() :
+    tile = FullyConnectedTile(width=2, height=1, internal_bit_count=0)
+    embedder = TileMipEmbedder(tile)
+    modules = [BooleanSetModule(s) for s in ['0000|1111', '0011|1100|0101', '0000|1111', '1000|0100|0010|0001']]
+    for module in modules :
+        result = embedder.embed(module)
+        assert_embedding(module, result)
+        assert result.gap == pytest.approx(TileMipEmbedder(tile).embed(module).gap)
+    assert len(embedder.lps[4].constraints) == 16
+
+def test_set_too_wide_for_tile() :
+    with pytest.raises(ValueError) as error :
+        TileMipEmbedder(FullyConnectedTile(1, 0, 0)).embed(BooleanSetModule('000'))
+    assert str(error.value) == 'BooleanSetModule of width 3 does not fit on a tile with 2 variables'
+
+def test_embedder_for_other_tile() :
+    module = BooleanSetModule('00|11')
+    module.enable_experimental_mip_embedding = True
+    embedder = TileMipEmbedder(FullyConnectedTile(1, 0, 0))
+    with pytest.raises(ValueError) :
+        module.embed_onto_tile_mip(FullyConnectedTile(1, 0, 0), embedder)
@@ -0,0 +1,84 @@
+""" Tests for the variable elimination solver, mostly of the widths its elimination orders give """
+#pylint: disable=missing-function-docstring line-too-long
+
+import pytest
+from qubo_module.brute_force_solver import BruteForceSolver
+from qubo_module.variable_elimination_solver import VariableEliminationSolver
+from test_brute_force_solver import disjoint_union, random_qubo, solution_str, xor_chain
+
+def test_simple_models() :
+    assert solution_str(VariableEliminationSolver({'A' : 0}, {}).solve()) == "0/0 0|1"
+    assert solution_str(VariableEliminationSolver({'A':1, 'B':-1}, { ('A','B') : -2 }).solve()) == "-2/-1 11"
+    assert solution_str(VariableEliminationSolver({}, {}).solve()) == "0/0 "
+
+def grid(size) :
+    """ A size x size grid with frustrated couplings, whose treewidth is size """
+    linear = {(i, j) : -1 for i in range(size) for j in range(size)}
+    quadratic = {}
+    for i in range(size) :
+        for j in range(size) :
+            if i + 1 < size :
+                quadratic[((i, j), (i + 1, j))] = 1
+            if j + 1 < size :
+                quadratic[((i, j), (i, j + 1))] = 1
+    return linear, quadratic
+
+def test_width_of_known_graphs() :
+    assert VariableEliminationSolver({i : 1 for i in range(20)}, {(i, (i + 1) % 20) : -1 for i in range(20)}).width == 2
+    assert VariableEliminationSolver({i : 1 for i in range(20)}, {(0, i) : -1 for i in range(1, 20)}).width == 1
+    for size in range(3, 6) :
+        assert VariableEliminationSolver(*grid(size)).width == size
+    # Components are eliminated independently, so a union is only as wide as its widest piece
+    assert VariableEliminationSolver(*disjoint_union(grid(3), grid(4), grid(3))).width == 4
+
+def test_grid_matches_brute_force() :
+    linear, quadratic = grid(4)
+    expected = BruteForceSolver(linear, quadratic, engine='vectorized').solve()
+    assert solution_str(VariableEliminationSolver(linear, quadratic).solve()) == solution_str(expected)
+
+def test_order_sets_width() :
+    # Eliminating the centre of a star first joins all of its leaves
+    linear = {i : (-1)**i for i in range(12)}
+    quadratic = {(0, i) : i % 3 - 1 for i in range(1, 12)}
+    solver = VariableEliminationSolver(linear, quadratic, order=list(range(12)))
+    assert solver.width == 11
+    assert VariableEliminationSolver(linear, quadratic).width == 1
+    assert solution_str(solver.solve()) == solution_str(BruteForceSolver(linear, quadratic).solve())
+
+def test_short_chain_matches_brute_force() :
+    linear, quadratic = xor_chain(2)
+    expected = BruteForceSolver(linear, quadratic, engine='vectorized').solve()
+    actual = VariableEliminationSolver(linear, quadratic).solve()
+    assert solution_str(actual) == solution_str(expected)
+
+def test_long_chain() :
+    """ 200 modules and over a thousand variables, far beyond brute force """
+    linear, quadratic = xor_chain(200)
+    solver = VariableEliminationSolver(linear, quadratic)
+    assert solver.variable_count > 1000
+    assert solver.width <= 6
+
+    single = BruteForceSolver(*xor_chain(1)).solve()
+    result = solver.solve(max_solutions=50)
+    assert result.best_obj == pytest.approx(0)
+    assert result.gap == pytest.approx(single.gap)
+    assert len(result.solutions) == 50
+    for solution in result.solutions :
+        bits = dict(zip(solver.var_name_by_idx, solution))
+        assert all(bits[('c', i + 1)] == bits[('c', i)] ^ bits[('b', i)] for i in range(200))
+
+def test_given_order() :
+    linear, quadratic = random_qubo(8, seed=4)
+    expected = VariableEliminationSolver(linear, quadratic).solve()
+    solver = VariableEliminationSolver(linear, quadratic, order=[f'v{i}' for i in range(8)])
+    assert solution_str(solver.solve()) == solution_str(expected)
+
+    with pytest.raises(ValueError) as error :
+        VariableEliminationSolver(linear, quadratic, order=['v0'])
+    assert str(error.value) == 'The elimination order must list every variable exactly once'
+
+def test_too_wide() :
+    linear, quadratic = random_qubo(12, seed=2, density=1.0)
+    with pytest.raises(ValueError) as error :
+        VariableEliminationSolver(linear, quadratic, max_width=8)
+    assert str(error.value) == 'Decomposition too wide! Width is 11, max is 8.'